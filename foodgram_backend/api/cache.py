@@ -0,0 +1,215 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+
+from api.metrics import CACHE_REQUESTS
+from api.models import DataVersion
+
+GENERATION_KEY = 'api:generation:{}'
+HITS_KEY = 'api:hits'
+MISSES_KEY = 'api:misses'
+
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+
+def get_cache():
+    return caches['api']
+
+
+def increment(key):
+    """Увеличивает счётчик в кэше, создавая его при отсутствии."""
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def user_resource(user_id):
+    """Ресурс с данными пользователя: избранное, корзина, подписки."""
+    return f'user:{user_id}'
+
+
+def is_shared_cache():
+    """Общий ли кэш api для всех процессов сервиса."""
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+def get_generations(*resources):
+    """Текущие поколения данных ресурсов.
+
+    Поколения хранятся в общем кэше без срока жизни, поэтому ответ
+    из кэша не требует запросов к базе. Если ключа нет, например его
+    вытеснил кэш, ресурс получает новое поколение от текущего времени.
+    Кэш, локальный для процесса, не видит изменений из других
+    процессов, поэтому тогда поколения читаются из базы.
+    """
+    if not is_shared_cache():
+        versions = dict(
+            DataVersion.objects.filter(resource__in=resources).values_list(
+                'resource', 'version'
+            )
+        )
+        return tuple(versions.get(resource, 0) for resource in resources)
+    cache = get_cache()
+    keys = [GENERATION_KEY.format(resource) for resource in resources]
+    values = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        generation = values.get(key)
+        if generation is None:
+            seed = time.time_ns() // 1000
+            cache.add(key, seed, timeout=None)
+            generation = cache.get(key, seed)
+        generations.append(generation)
+    return tuple(generations)
+
+
+def get_generation(resource=RECIPES):
+    """Текущее поколение данных ресурса."""
+    return get_generations(resource)[0]
+
+
+def invalidate(resource=RECIPES):
+    """Переводит ресурс на новое поколение, старые ответы устаревают."""
+    if is_shared_cache():
+        cache = get_cache()
+        key = GENERATION_KEY.format(resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+        return
+    versions = DataVersion.objects.filter(resource=resource)
+    if versions.update(version=F('version') + 1):
+        return
+    # Первое изменение ресурса: строку могли создать параллельно,
+    # поэтому она вставляется с нулём, а затем увеличивается.
+    DataVersion.objects.bulk_create(
+        [DataVersion(resource=resource)], ignore_conflicts=True
+    )
+    versions.update(version=F('version') + 1)
+
+
+def get_stats():
+    """Возвращает число попаданий и промахов кэша."""
+    values = get_cache().get_many((HITS_KEY, MISSES_KEY))
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / (hits + misses) if hits + misses else 0,
+        'generation': get_generation(RECIPES),
+    }
+
+
+def response_cache_key(request):
+    """Ключ ответа: поколение, адрес, формат и отсортированные параметры."""
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+    return ':'.join((
+        'api:response',
+        str(get_generation(RECIPES)),
+        request.accepted_renderer.format,
+        request.get_host(),
+        request.path,
+        params,
+    ))
+
+
+class AnonymousCacheMixin:
+    """Кэширует ответы list и retrieve для анонимных пользователей."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            increment(HITS_KEY)
+            CACHE_REQUESTS.inc(result='hit')
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+        increment(MISSES_KEY)
+        CACHE_REQUESTS.inc(result='miss')
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key, (rendered.content, rendered['Content-Type'])
+                )
+            )
+        return response
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 Not Modified, если ETag клиента совпадает с текущим.
+
+    ETag строится из get_etag_parts без сериализации ответа.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+
+    def get_etag_parts(self, request):
+        """Возвращает версии данных ответа или None, если ETag не нужен."""
+        return None
+
+    def get_etag(self, request):
+        parts = self.get_etag_parts(request)
+        if parts is None:
+            return None
+        parts = (
+            *parts, request.accepted_renderer.format, request.get_full_path()
+        )
+        return quote_etag(
+            hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = None
+        if self.action in self.conditional_actions:
+            etag = self.get_etag(request)
+        if etag:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+        response = handler(request, *args, **kwargs)
+        if etag and response.status_code == 200:
+            response['ETag'] = etag
+        return response
@@ -0,0 +1,82 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+User = get_user_model()
+
+
+def percentiles(timings):
+    """Возвращает p50 и p95 замеров."""
+    timings = sorted(timings)
+    return (
+        statistics.median(timings),
+        timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    )
+
+
+def average_time(function, repeat):
+    """Выполняет function repeat раз.
+
+    Возвращает последний результат и среднее время в миллисекундах.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) * 1000 / repeat
+
+
+class BenchmarkCommand(BaseCommand):
+    """Основа команд замеров.
+
+    Запросы выполняются тестовым клиентом, поэтому на время команды
+    разрешается хост testserver. Общие параметры - --repeat и --user.
+    """
+
+    default_repeat = 20
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=self.default_repeat,
+                            help='Количество замеров.')
+        parser.add_argument('--user', type=int, default=None,
+                            help='id пользователя, от имени которого '
+                                 'выполняются запросы. По умолчанию - '
+                                 'пользователь с наибольшим числом '
+                                 'подписок.')
+
+    def execute(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            return super().execute(*args, **options)
+
+    def get_users(self):
+        """Пользователи, из которых выбирается пользователь по умолчанию."""
+        return User.objects.all()
+
+    def get_user(self, user_id):
+        if user_id is not None:
+            user = User.objects.filter(pk=user_id).first()
+        else:
+            user = self.get_users().annotate(
+                follows=Count('following', distinct=True)
+            ).order_by('-follows', 'pk').first()
+        if user is None:
+            raise CommandError('Пользователь не найден!')
+        return user
+
+    def get_client(self, user=None):
+        """Клиент API, авторизованный как user, или анонимный."""
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def get_request(self, user=None):
+        """Запрос к ленте рецептов от user или от анонима."""
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = user or AnonymousUser()
+        return request
@@ -0,0 +1,239 @@
+import json
+import math
+import time
+from itertools import combinations
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from api.management.benchmark import BenchmarkCommand, percentiles
+from recipes.models import Ingredient, Recipe
+
+User = get_user_model()
+
+FEED_URL = '/api/recipes/'
+BUDGET_PATH = Path(__file__).resolve().parents[2] / 'benchmark_budget.json'
+LIST_FILTERS = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+# Управление транзакциями не считается: SQLite пишет в журнал BEGIN,
+# а точки сохранения появляются только во вложенных транзакциях.
+TRANSACTION_STATEMENTS = (
+    'BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT',
+)
+
+
+class Command(BenchmarkCommand):
+    help = ('Замер p50/p95 времени ответа и числа SQL-запросов основных '
+            'эндпоинтов API и сверка с бюджетом из файла. Превышение '
+            'бюджета завершает команду с ошибкой. Команда добавляет '
+            'и удаляет избранное, корзину и подписки, поэтому её нужно '
+            'запускать на сгенерированных данных (generate_data).')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--budget', type=Path, default=BUDGET_PATH,
+                            help='Путь к файлу бюджета.')
+        parser.add_argument('--queries-only', action='store_true',
+                            help='Сверять с бюджетом только число '
+                                 'запросов, без времени ответа.')
+        parser.add_argument('--latency-factor', type=float, default=1.0,
+                            help='Во сколько раз допустимое p95 больше '
+                                 'бюджета, например на медленной машине '
+                                 'CI.')
+        parser.add_argument('--update-budget', action='store_true',
+                            help='Записать в файл бюджета измеренные '
+                                 'значения вместо сверки.')
+        parser.add_argument('--headroom', type=float, default=2.0,
+                            help='Во сколько раз бюджет p95 при '
+                                 '--update-budget больше измеренного.')
+
+    def get_users(self):
+        """Пользователи с рецептом и в избранном, и в корзине: иначе
+        фильтры ленты вернут пустые страницы."""
+        return User.objects.filter(
+            cart__recipe__fav_recipes__user=F('pk')
+        ).distinct()
+
+    def get_cases(self, user):
+        """Группы запросов: запросы группы выполняются подряд.
+
+        Значения фильтров берутся от рецепта, который пользователь
+        добавил и в избранное, и в корзину, поэтому любое их сочетание
+        находит хотя бы этот рецепт.
+        """
+        linked = Recipe.objects.filter(
+            fav_recipes__user=user, cart__user=user
+        ).order_by('-pub_date', '-id').first()
+        # Рецепт для добавления в избранное и корзину и удаления из них.
+        recipe = Recipe.objects.exclude(fav_recipes__user=user).exclude(
+            cart__user=user
+        ).order_by('-pub_date', '-id').first()
+        tag = linked and linked.tags.order_by('pk').first()
+        ingredient = Ingredient.objects.order_by('pk').first()
+        if None in (linked, recipe, tag, ingredient):
+            raise CommandError('Не хватает данных, запустите generate_data!')
+        author = User.objects.exclude(pk=user.pk).exclude(
+            followers__user_id=user
+        ).order_by('pk').first()
+
+        values = {
+            'tags': tag.slug,
+            'author': linked.author_id,
+            'is_favorited': 1,
+            'is_in_shopping_cart': 1,
+        }
+        cases = []
+        for size in range(len(LIST_FILTERS) + 1):
+            for names in combinations(LIST_FILTERS, size):
+                query = '&'.join(f'{name}={values[name]}' for name in names)
+                cases.append([(
+                    'recipes: ' + ('+'.join(names) or 'без фильтров'),
+                    'get', f'/api/recipes/?{query}', True,
+                )])
+        word = linked.name.split()[-1]
+        cases += [
+            [('recipes: search', 'get', f'/api/recipes/?search={word}',
+              True)],
+            [('recipes: ordering=popular', 'get',
+              '/api/recipes/?ordering=popular', True)],
+            [('recipes: cursor', 'get', '/api/recipes/?pagination=cursor',
+              True)],
+            [('recipes: аноним', 'get', '/api/recipes/', False)],
+            [('recipe detail', 'get', f'/api/recipes/{recipe.pk}/', True)],
+            [('ingredients: search', 'get',
+              f'/api/ingredients/?name={ingredient.name[:3]}', True)],
+            [('users: subscriptions', 'get',
+              '/api/users/subscriptions/?recipes_limit=3', True)],
+            [
+                ('favorite: add', 'post',
+                 f'/api/recipes/{recipe.pk}/favorite/', True),
+                ('favorite: remove', 'delete',
+                 f'/api/recipes/{recipe.pk}/favorite/', True),
+            ],
+            [
+                ('shopping_cart: add', 'post',
+                 f'/api/recipes/{recipe.pk}/shopping_cart/', True),
+                ('shopping_cart: remove', 'delete',
+                 f'/api/recipes/{recipe.pk}/shopping_cart/', True),
+            ],
+            [('download_shopping_cart', 'get',
+              '/api/recipes/download_shopping_cart/', True)],
+        ]
+        if author is not None:
+            cases.append([
+                ('users: subscribe', 'post',
+                 f'/api/users/{author.pk}/subscribe/', True),
+                ('users: unsubscribe', 'delete',
+                 f'/api/users/{author.pk}/subscribe/', True),
+            ])
+        return cases
+
+    def request(self, client, method, url):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {url} вернул {response.status_code}'
+            )
+        if url.split('?')[0] == FEED_URL and not response.json()['results']:
+            # На пустой странице не видно времени сериализации.
+            raise CommandError(f'{url} вернул пустую страницу')
+        return elapsed, sum(
+            not query['sql'].upper().startswith(TRANSACTION_STATEMENTS)
+            for query in queries
+        )
+
+    def run_cases(self, cases, clients, repeat):
+        results = {}
+        for group in cases:
+            # Первый проход прогревает кэши и не учитывается.
+            for iteration in range(repeat + 1):
+                for name, method, url, authenticated in group:
+                    timing, queries = self.request(
+                        clients[authenticated], method, url
+                    )
+                    result = results.setdefault(
+                        name, {'timings': [], 'queries': 0}
+                    )
+                    if iteration:
+                        result['timings'].append(timing)
+                        result['queries'] = max(result['queries'], queries)
+        for result in results.values():
+            result['p50_ms'], result['p95_ms'] = percentiles(
+                result.pop('timings')
+            )
+        return results
+
+    def check_budget(self, result, budget, queries_only, latency_factor):
+        """Возвращает список превышений бюджета."""
+        if budget is None:
+            return ['нет бюджета']
+        problems = []
+        if result['queries'] > budget['queries']:
+            problems.append(
+                f'запросов {result["queries"]} > {budget["queries"]}'
+            )
+        p95_budget = budget['p95_ms'] * latency_factor
+        if not queries_only and result['p95_ms'] > p95_budget:
+            problems.append(
+                f'p95 {result["p95_ms"]:.1f} > {p95_budget:g} мс'
+            )
+        return problems
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('Нужен хотя бы один замер!')
+        user = self.get_user(options['user'])
+        clients = {True: self.get_client(user), False: self.get_client()}
+        results = self.run_cases(
+            self.get_cases(user), clients, options['repeat']
+        )
+
+        if options['update_budget']:
+            budget = {
+                name: {
+                    'queries': result['queries'],
+                    'p95_ms': math.ceil(
+                        result['p95_ms'] * options['headroom']
+                    ),
+                }
+                for name, result in results.items()
+            }
+            options['budget'].write_text(
+                json.dumps(budget, ensure_ascii=False, indent=2) + '\n',
+                encoding='utf-8',
+            )
+            self.stdout.write(f'Бюджет записан в {options["budget"]}.')
+            return
+
+        try:
+            budget = json.loads(options['budget'].read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            budget = {}
+        failures = 0
+        self.stdout.write(
+            f'Рецептов в базе: {Recipe.objects.count()}, '
+            f'пользователь: {user.pk}.'
+        )
+        for name, result in results.items():
+            problems = self.check_budget(
+                result, budget.get(name), options['queries_only'],
+                options['latency_factor'],
+            )
+            if name in budget and problems:
+                failures += 1
+            self.stdout.write(
+                f'{name:<50} p50 {result["p50_ms"]:8.2f} мс   '
+                f'p95 {result["p95_ms"]:8.2f} мс   '
+                f'запросов {result["queries"]:3}   '
+                + ('; '.join(problems) or 'OK')
+            )
+        if failures:
+            raise CommandError(f'Бюджет превышен у запросов: {failures}!')
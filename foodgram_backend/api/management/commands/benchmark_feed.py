@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import CommandError
+from rest_framework.pagination import Cursor
+
+from api.management.benchmark import BenchmarkCommand, percentiles
+from api.pagination import RecipeCursorPagination
+from recipes.models import Recipe
+
+FEED_URL = '/api/recipes/'
+
+
+class Command(BenchmarkCommand):
+    help = ('Замер времени ответа ленты рецептов на первой и дальней '
+            'странице при постраничной пагинации и пагинации по курсору.')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--page', type=int, default=1000,
+                            help='Номер дальней страницы.')
+        parser.add_argument('--limit', type=int, default=6,
+                            help='Количество рецептов на странице.')
+
+    def cursor_url(self, limit, offset):
+        """Ссылка на страницу курсора, начинающуюся после offset рецептов."""
+        paginator = RecipeCursorPagination()
+        paginator.base_url = f'{FEED_URL}?pagination=cursor&limit={limit}'
+        if not offset:
+            return paginator.base_url
+        pub_date, pk = Recipe.objects.order_by(
+            *paginator.ordering
+        ).values_list('pub_date', 'pk')[offset - 1]
+        return paginator.encode_cursor(Cursor(
+            offset=0, reverse=False,
+            position=paginator.get_position(pub_date, pk),
+        ))
+
+    def measure(self, client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} вернул {response.status_code}')
+        return percentiles(timings)
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('В базе нет рецептов!')
+        page = min(options['page'], (total - 1) // limit + 1)
+        offset = (page - 1) * limit
+        cases = (
+            ('page=1', f'{FEED_URL}?page=1&limit={limit}'),
+            (f'page={page}', f'{FEED_URL}?page={page}&limit={limit}'),
+            ('cursor, страница 1', self.cursor_url(limit, 0)),
+            (f'cursor, страница {page}', self.cursor_url(limit, offset)),
+        )
+        # Запросы идут от пользователя: анонимные ответы берутся
+        # из кэша и не показывают время самой ленты.
+        client = self.get_client(self.get_user(options['user']))
+        self.stdout.write(f'Рецептов в базе: {total}.')
+        for name, url in cases:
+            median, p95 = self.measure(client, url, options['repeat'])
+            self.stdout.write(
+                f'{name:<24} p50 {median:8.2f} мс   p95 {p95:8.2f} мс'
+            )
@@ -0,0 +1,56 @@
+from django.core.management.base import CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.management.benchmark import BenchmarkCommand, average_time
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+
+class Command(BenchmarkCommand):
+    help = ('Сверка FastJSONRenderer со стандартным JSONRenderer '
+            'и замер времени рендеринга страницы рецептов.')
+
+    default_repeat = 100
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Количество рецептов.')
+
+    def render(self, renderer, data, repeat):
+        return average_time(lambda: renderer.render(data), repeat)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson не установлен!')
+        request = self.get_request(self.get_user(options['user']))
+        recipes = list(
+            Recipe.objects.for_read(request.user)[:options['limit']]
+        )
+        if not recipes:
+            raise CommandError('В базе нет рецептов!')
+        data = {
+            'count': len(recipes),
+            'next': None,
+            'previous': None,
+            'results': RecipeReadSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+        }
+
+        default, default_time = self.render(
+            JSONRenderer(), data, options['repeat']
+        )
+        fast, fast_time = self.render(
+            renderers.FastJSONRenderer(), data, options['repeat']
+        )
+        if default != fast:
+            raise CommandError('FastJSONRenderer выдаёт другой результат!')
+        self.stdout.write(
+            f'Рецептов: {len(recipes)}, ответы совпадают '
+            f'({len(default)} байт).\n'
+            f'JSONRenderer: {default_time:.3f} мс, '
+            f'FastJSONRenderer: {fast_time:.3f} мс, '
+            f'ускорение x{default_time / fast_time:.1f}.'
+        )
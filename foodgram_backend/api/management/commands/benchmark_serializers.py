@@ -0,0 +1,56 @@
+from django.core.management.base import CommandError
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from api.management.benchmark import BenchmarkCommand, average_time
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+
+class Command(BenchmarkCommand):
+    help = ('Сверка быстрого пути RecipeReadSerializer с обычным '
+            'и замер времени сериализации страницы рецептов '
+            'для анонима и пользователя.')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Количество рецептов.')
+
+    def render(self, recipes, request, fast, repeat):
+        with override_settings(RECIPE_FAST_SERIALIZATION=fast):
+            return average_time(
+                lambda: JSONRenderer().render(RecipeReadSerializer(
+                    recipes, many=True, context={'request': request}
+                ).data),
+                repeat,
+            )
+
+    def handle(self, *args, **options):
+        # У анонима и пользователя с подписками разные поля ответа.
+        for user in (None, self.get_user(options['user'])):
+            request = self.get_request(user)
+            recipes = list(
+                Recipe.objects.for_read(request.user)[:options['limit']]
+            )
+            if not recipes:
+                raise CommandError('В базе нет рецептов!')
+
+            default, default_time = self.render(
+                recipes, request, False, options['repeat']
+            )
+            fast, fast_time = self.render(
+                recipes, request, True, options['repeat']
+            )
+            name = user.username if user else 'аноним'
+            if default != fast:
+                raise CommandError(
+                    f'Быстрый путь выдаёт другой результат ({name})!'
+                )
+            self.stdout.write(
+                f'Пользователь: {name}. Рецептов: {len(recipes)}, '
+                f'ответы совпадают ({len(default)} байт).\n'
+                f'Обычный путь: {default_time:.2f} мс, '
+                f'быстрый путь: {fast_time:.2f} мс, '
+                f'ускорение x{default_time / fast_time:.1f}.'
+            )
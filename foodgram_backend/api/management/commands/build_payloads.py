@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.payloads import PAYLOAD_SOURCES, store_payload
+
+
+class Command(BaseCommand):
+    help = 'Сборка готовых JSON-списков тегов и ингредиентов в базе данных.'
+
+    def handle(self, *args, **options):
+        for resource in PAYLOAD_SOURCES:
+            body, gzipped = store_payload(resource)
+            self.stdout.write(
+                f'{resource}: {len(body)} байт, gzip {len(gzipped)} байт.'
+            )
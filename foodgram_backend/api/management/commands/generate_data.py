@@ -0,0 +1,343 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+from random import Random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.cache import RECIPES, TAGS, invalidate
+from cart.models import Cart, ShoppingListItem
+from cart.utils import calculate_shopping_lists
+from recipes.constants import MAX_COOKING_TIME, MIN_COOKING_TIME
+from recipes.models import (Favourite, Ingredient, Recipe,
+                            RecipeIngredientValue, Tag)
+from recipes.search import get_search_backend
+from users.models import UserFollow
+
+User = get_user_model()
+
+FIRST_NAMES = (
+    'Анна', 'Мария', 'Елена', 'Ольга', 'Наталья', 'Ирина', 'Алексей',
+    'Дмитрий', 'Иван', 'Сергей', 'Андрей', 'Михаил', 'Павел', 'Юлия',
+)
+LAST_NAMES = (
+    'Иванова', 'Смирнова', 'Кузнецова', 'Попова', 'Соколова', 'Лебедев',
+    'Козлов', 'Новиков', 'Морозов', 'Петров', 'Волков', 'Соловьёв',
+)
+DISHES = (
+    'суп', 'салат', 'пирог', 'рагу', 'запеканка', 'каша', 'омлет',
+    'паста', 'соус', 'десерт', 'жаркое', 'котлеты', 'блины',
+)
+AMOUNTS = (1, 2, 3, 5, 10, 20, 50, 100, 150, 200, 250, 300, 500)
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class ZipfChooser:
+    """Выбор элементов с частотой по закону Ципфа.
+
+    Элементы перемешиваются, и первые после перемешивания выбираются
+    чаще всего: так распределены популярные авторы, рецепты
+    и ингредиенты.
+    """
+
+    def __init__(self, items, rng, exponent=1.1):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.items) + 1)
+        ))
+
+    def choose(self):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def sample(self, count):
+        """До count разных элементов."""
+        count = min(count, len(self.items))
+        result = {}
+        for _ in range(count * 10):
+            if len(result) >= count:
+                break
+            result.setdefault(self.choose())
+        return list(result)
+
+
+@contextmanager
+def manual_pub_date():
+    """Позволяет задать дату публикации рецептов при bulk_create."""
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def inserted_ids(model, objects):
+    """id только что добавленных bulk_create объектов.
+
+    Если СУБД не возвращает id, берутся последние добавленные строки.
+    """
+    if objects and objects[0].pk is not None:
+        return [obj.pk for obj in objects]
+    return list(
+        model.objects.order_by('-pk').values_list('pk', flat=True)[
+            :len(objects)
+        ]
+    )[::-1]
+
+
+class Command(BaseCommand):
+    help = ('Генерация синтетических пользователей, подписок, рецептов, '
+            'избранного и корзин для нагрузочного тестирования. '
+            'При одинаковом --seed данные совпадают.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100,
+                            help='Количество пользователей.')
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Количество рецептов.')
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--favourites', type=int, default=20,
+                            help='Среднее число избранных рецептов '
+                                 'у пользователя.')
+        parser.add_argument('--carts', type=int, default=3,
+                            help='Среднее число рецептов в корзине '
+                                 'пользователя.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить даты '
+                                 'публикации рецептов.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Начальное значение генератора '
+                                 'случайных чисел.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Количество строк в одной вставке.')
+        parser.add_argument('--prefix', default='synthetic',
+                            help='Префикс имён пользователей.')
+        parser.add_argument('--password', default='password',
+                            help='Пароль всех пользователей.')
+
+    def stage(self, message):
+        elapsed = time.perf_counter() - self.start
+        self.stdout.write(f'[{elapsed:7.1f} с] {message}')
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        user_ids = []
+        for numbers in batches(range(options['users']), self.batch_size):
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{prefix}{number}',
+                    email=f'{prefix}{number}@example.com',
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for number in numbers
+            ])
+            user_ids.extend(inserted_ids(User, users))
+        self.stage(f'Пользователей: {len(user_ids)}.')
+        return user_ids
+
+    def create_follows(self, user_ids, average):
+        authors = ZipfChooser(user_ids, self.rng)
+        follows = []
+        total = 0
+        for user_id in user_ids:
+            for author_id in authors.sample(
+                self.rng.randint(0, 2 * average)
+            ):
+                if author_id != user_id:
+                    follows.append(UserFollow(
+                        user_id_id=user_id, following_user_id_id=author_id
+                    ))
+            if len(follows) >= self.batch_size:
+                UserFollow.objects.bulk_create(follows)
+                total += len(follows)
+                follows = []
+        UserFollow.objects.bulk_create(follows)
+        self.stage(f'Подписок: {total + len(follows)}.')
+
+    def create_recipes(self, user_ids, options):
+        authors = ZipfChooser(user_ids, self.rng)
+        ingredients = ZipfChooser(
+            Ingredient.objects.order_by('id').values_list('id', 'name'),
+            self.rng
+        )
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        now = timezone.now()
+        period = options['days'] * 24 * 60 * 60
+        recipe_ids = []
+        for numbers in batches(range(options['recipes']), self.batch_size):
+            recipes = []
+            relations = []
+            for number in numbers:
+                recipe_ingredients = ingredients.sample(
+                    round(self.rng.triangular(3, 15, 7))
+                )
+                dish = self.rng.choice(DISHES)
+                cooking_time = min(max(
+                    round(self.rng.lognormvariate(3.4, 0.6)),
+                    MIN_COOKING_TIME
+                ), MAX_COOKING_TIME)
+                recipes.append(Recipe(
+                    author_id=authors.choose(),
+                    name=f'{dish.capitalize()}: {recipe_ingredients[0][1]}',
+                    text=(
+                        f'{dish.capitalize()} из ингредиентов: '
+                        + ', '.join(name for _, name in recipe_ingredients)
+                        + f'. Рецепт №{number}.'
+                    ),
+                    cooking_time=cooking_time,
+                    pub_date=now - timedelta(
+                        seconds=self.rng.randrange(period or 1)
+                    ),
+                ))
+                relations.append((
+                    [
+                        (ingredient_id, self.rng.choice(AMOUNTS))
+                        for ingredient_id, _ in recipe_ingredients
+                    ],
+                    self.rng.sample(
+                        tag_ids, self.rng.randint(1, min(2, len(tag_ids)))
+                    ),
+                ))
+            with transaction.atomic(), manual_pub_date():
+                recipes = Recipe.objects.bulk_create(recipes)
+                ids = inserted_ids(Recipe, recipes)
+                RecipeIngredientValue.objects.bulk_create(
+                    [
+                        RecipeIngredientValue(
+                            recipe_id=recipe_id,
+                            ingredients_id=ingredient_id,
+                            amount=amount,
+                        )
+                        for recipe_id, (values, _) in zip(ids, relations)
+                        for ingredient_id, amount in values
+                    ],
+                    batch_size=self.batch_size,
+                )
+                Recipe.tags.through.objects.bulk_create(
+                    [
+                        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag)
+                        for recipe_id, (_, tags) in zip(ids, relations)
+                        for tag in tags
+                    ],
+                    batch_size=self.batch_size,
+                )
+            recipe_ids.extend(ids)
+            self.stage(f'Рецептов: {len(recipe_ids)}.')
+        return recipe_ids
+
+    def create_links(self, model, user_ids, recipe_ids, average):
+        """Добавляет пользователям рецепты в избранное или корзину.
+
+        Возвращает число добавлений каждого рецепта.
+        """
+        recipes = ZipfChooser(recipe_ids, self.rng)
+        counts = Counter()
+        links = []
+        for user_id in user_ids:
+            for recipe_id in recipes.sample(
+                self.rng.randint(0, 2 * average)
+            ):
+                links.append(model(user_id=user_id, recipe_id=recipe_id))
+                counts[recipe_id] += 1
+            if len(links) >= self.batch_size:
+                model.objects.bulk_create(links)
+                links = []
+        model.objects.bulk_create(links)
+        self.stage(
+            f'{model._meta.verbose_name_plural}: {sum(counts.values())}.'
+        )
+        return counts
+
+    def update_counters(self, field, counts):
+        groups = defaultdict(list)
+        for recipe_id, count in counts.items():
+            groups[count].append(recipe_id)
+        for count, ids in groups.items():
+            for chunk in batches(ids, self.batch_size):
+                Recipe.objects.filter(pk__in=chunk).update(
+                    **{field: F(field) + count}
+                )
+
+    def create_shopping_lists(self, user_ids):
+        total = 0
+        for chunk in batches(user_ids, self.batch_size):
+            items = ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=amount,
+                    )
+                    for (user_id, ingredient_id), amount in (
+                        calculate_shopping_lists(chunk).items()
+                    )
+                ),
+                batch_size=self.batch_size,
+            )
+            total += len(items)
+        self.stage(f'Строк в списках покупок: {total}.')
+
+    def handle(self, *args, **options):
+        self.rng = Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.start = time.perf_counter()
+        if self.batch_size < 1:
+            raise CommandError('Размер вставки должен быть больше нуля!')
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь!')
+        if not Ingredient.objects.exists():
+            raise CommandError(
+                'Нет ингредиентов, загрузите их командой add_data!'
+            )
+        if User.objects.filter(
+            username__startswith=options['prefix']
+        ).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {options["prefix"]} уже есть, '
+                'укажите другой --prefix!'
+            )
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+
+        user_ids = self.create_users(options)
+        self.create_follows(user_ids, options['follows'])
+        recipe_ids = self.create_recipes(user_ids, options)
+        if recipe_ids:
+            self.update_counters('favorites_count', self.create_links(
+                Favourite, user_ids, recipe_ids, options['favourites']
+            ))
+            self.update_counters('in_carts_count', self.create_links(
+                Cart, user_ids, recipe_ids, options['carts']
+            ))
+            self.create_shopping_lists(user_ids)
+            get_search_backend().update_recipes(
+                Recipe.objects.filter(search_vector__isnull=True)
+            )
+        invalidate(RECIPES)
+        invalidate(TAGS)
+        self.stage('Данные сгенерированы!')
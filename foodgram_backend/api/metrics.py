@@ -0,0 +1,368 @@
+import hmac
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+FILE_PREFIX = 'metrics_'
+INITIAL_FILE_SIZE = 64 * 1024
+HEADER_SIZE = 8
+LENGTH = struct.Struct('<i')
+VALUE = struct.Struct('<d')
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = tuple(
+    size * 1024 for size in (16, 64, 256, 1024, 4096, 10240, 20480)
+)
+
+_registry = []
+_store = None
+_store_lock = threading.Lock()
+
+
+def read_file(path):
+    """Записи файла метрик: ключ, значение и смещение значения."""
+    data = Path(path).read_bytes()
+    if len(data) < HEADER_SIZE:
+        return
+    used, = LENGTH.unpack_from(data, 0)
+    position = HEADER_SIZE
+    while position < used:
+        length, = LENGTH.unpack_from(data, position)
+        key = data[position + LENGTH.size:position + LENGTH.size + length]
+        position += LENGTH.size + length + (-(LENGTH.size + length) % 8)
+        value, = VALUE.unpack_from(data, position)
+        yield key.decode(), value, position
+        position += VALUE.size
+
+
+class MemoryStore:
+    """Значения метрик в памяти одного процесса."""
+
+    def __init__(self):
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def add(self, key, amount):
+        with self.lock:
+            self.values[key] += amount
+
+    def collect(self):
+        with self.lock:
+            return dict(self.values)
+
+
+class FileStore:
+    """Значения метрик в отображённых в память файлах, файл на процесс.
+
+    Файл начинается с занятого размера, за ним идут записи: длина ключа,
+    ключ в UTF-8, дополненный до границы 8 байт, и значение double.
+    При сборе значения из файлов всех процессов складываются, в том числе
+    из файлов завершившихся воркеров gunicorn, поэтому счётчики
+    не сбрасываются при их перезапуске. Файлы прошлых запусков удаляет
+    clear_directory из хука on_starting в gunicorn.conf.py.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def open(self):
+        """Открывает файл текущего процесса, в том числе после fork."""
+        self.pid = os.getpid()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'{FILE_PREFIX}{self.pid}.db'
+        fd = os.open(path, os.O_RDWR | os.O_CREAT)
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER_SIZE:
+                size = INITIAL_FILE_SIZE
+                os.ftruncate(fd, size)
+                os.pwrite(fd, LENGTH.pack(HEADER_SIZE), 0)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.path = path
+        self.positions = {
+            key: position for key, _, position in read_file(path)
+        }
+        self.used, = LENGTH.unpack_from(self.map, 0)
+
+    def append(self, key):
+        encoded = key.encode()
+        padding = -(LENGTH.size + len(encoded)) % 8
+        entry = (
+            LENGTH.pack(len(encoded)) + encoded + b'\0' * padding
+            + VALUE.pack(0.0)
+        )
+        if self.used + len(entry) > len(self.map):
+            size = len(self.map)
+            while self.used + len(entry) > size:
+                size *= 2
+            self.map.resize(size)
+        self.map[self.used:self.used + len(entry)] = entry
+        position = self.used + len(entry) - VALUE.size
+        self.used += len(entry)
+        # Размер обновляется последним, чтобы при сборе из других
+        # процессов не читались недописанные записи.
+        LENGTH.pack_into(self.map, 0, self.used)
+        self.positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.open()
+            position = self.positions.get(key)
+            if position is None:
+                position = self.append(key)
+            value, = VALUE.unpack_from(self.map, position)
+            VALUE.pack_into(self.map, position, value + amount)
+
+    def collect(self):
+        values = defaultdict(float)
+        for path in self.directory.glob(f'{FILE_PREFIX}*.db'):
+            for key, value, _ in read_file(path):
+                values[key] += value
+        return values
+
+
+def clear_directory(directory):
+    """Удаляет файлы метрик прошлых запусков сервиса."""
+    for path in Path(directory).glob(f'{FILE_PREFIX}*.db'):
+        path.unlink()
+
+
+def get_store():
+    """Хранилище метрик: файлы в METRICS_DIR или память процесса."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = (
+                    FileStore(settings.METRICS_DIR) if settings.METRICS_DIR
+                    else MemoryStore()
+                )
+    return _store
+
+
+def sample_key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('\n', r'\n').replace(
+                '"', r'\"'
+            ),
+        )
+        for name, value in labels
+    ) + '}'
+
+
+def format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        _registry.append(self)
+
+    def check_labels(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                f'Метрике {self.name} нужны метки {self.labels}.'
+            )
+
+    def add(self, name, amount, labels):
+        get_store().add(sample_key(name, labels), amount)
+
+    def get_samples(self, values):
+        """Строки значений метрики из собранных значений хранилища."""
+        return [
+            f'{name}{format_labels(labels)} {format_value(value)}'
+            for name, labels, value in sorted(self.select(values))
+        ]
+
+    def select(self, values, name=None):
+        """Значения с именем name: (имя, метки, значение)."""
+        name = name or self.name
+        for key, value in values.items():
+            sample_name, labels = json.loads(key)
+            if sample_name == name:
+                yield sample_name, tuple(map(tuple, labels)), value
+
+    def expose(self, values):
+        return '\n'.join([
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+            *self.get_samples(values),
+        ])
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.check_labels(labels)
+        self.add(self.name, amount, labels)
+
+    def total(self, values, **labels):
+        """Сумма значений с заданными метками."""
+        return sum(
+            value for _, sample_labels, value in self.select(values)
+            if set(labels.items()) <= set(sample_labels)
+        )
+
+
+class Histogram(Metric):
+    """Гистограмма.
+
+    В хранилище лежат количества по отдельным интервалам, накопленные
+    значения бакетов считаются при выводе.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=()):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self.bounds = tuple(map(format_value, self.buckets)) + ('+Inf',)
+
+    def observe(self, value, **labels):
+        self.check_labels(labels)
+        bound = self.bounds[bisect_left(self.buckets, value)]
+        self.add(self.name + '_bucket', 1, {**labels, 'le': bound})
+        self.add(self.name + '_sum', value, labels)
+        self.add(self.name + '_count', 1, labels)
+
+    def get_samples(self, values):
+        buckets = defaultdict(dict)
+        for _, labels, value in self.select(values, self.name + '_bucket'):
+            labels = dict(labels)
+            bound = labels.pop('le')
+            buckets[tuple(sorted(labels.items()))][bound] = value
+        totals = {
+            (name, labels): value
+            for suffix in ('_sum', '_count')
+            for name, labels, value in self.select(values, self.name + suffix)
+        }
+        samples = []
+        for labels in sorted(buckets):
+            cumulative = 0
+            for bound in self.bounds:
+                cumulative += buckets[labels].get(bound, 0)
+                samples.append(
+                    f'{self.name}_bucket'
+                    f'{format_labels(labels + (("le", bound),))} '
+                    f'{format_value(cumulative)}'
+                )
+            for suffix in ('_sum', '_count'):
+                name = self.name + suffix
+                samples.append(
+                    f'{name}{format_labels(labels)} '
+                    f'{format_value(totals.get((name, labels), 0))}'
+                )
+        return samples
+
+
+class Gauge(Metric):
+    """Значение, вычисляемое при выводе из собранных значений."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function):
+        super().__init__(name, documentation)
+        self.function = function
+
+    def get_samples(self, values):
+        return [f'{self.name} {format_value(self.function(values))}']
+
+
+def has_access(request):
+    """Доступ к метрикам: с адресов METRICS_ALLOWED_IPS или по токену
+    METRICS_TOKEN в заголовке Authorization: Bearer <токен>."""
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    if not settings.METRICS_TOKEN:
+        return False
+    scheme, _, token = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    )
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus."""
+    values = get_store().collect()
+    return '\n'.join(metric.expose(values) for metric in _registry) + '\n'
+
+
+def get_hit_ratio(values):
+    hits = CACHE_REQUESTS.total(values, result='hit')
+    total = CACHE_REQUESTS.total(values)
+    return hits / total if total else 0
+
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total',
+    'Количество запросов.',
+    ('route', 'method', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время ответа на запрос.',
+    ('route', 'method'),
+    DURATION_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'foodgram_http_db_queries',
+    'Количество SQL-запросов на один запрос.',
+    ('route',),
+    QUERY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'foodgram_http_db_duration_seconds',
+    'Время SQL-запросов на один запрос.',
+    ('route',),
+    DURATION_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_api_cache_requests_total',
+    'Обращения к кэшу ответов для анонимных пользователей.',
+    ('result',),
+)
+CACHE_HIT_RATIO = Gauge(
+    'foodgram_api_cache_hit_ratio',
+    'Доля попаданий в кэш ответов для анонимных пользователей.',
+    get_hit_ratio,
+)
+IMAGE_UPLOAD_SIZE = Histogram(
+    'foodgram_image_upload_bytes',
+    'Размер загружаемых изображений рецептов.',
+    buckets=SIZE_BUCKETS,
+)
@@ -0,0 +1,199 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from api.metrics import DB_DURATION, DB_QUERIES, REQUEST_DURATION, REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    """SQL-запросы и время этапов одного запроса."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.view_start = self.view_end = None
+        self.view_db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries[sql] += 1
+
+    @contextmanager
+    def capture(self):
+        """Учитывает запросы ко всем базам данных внутри блока."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+    def start_view(self):
+        self.view_start = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def end_view(self):
+        self.view_end = time.perf_counter()
+        self.view_db_time = self.db_time - self.view_db_time
+
+    def get_duplicates(self):
+        """Повторяющиеся запросы, самые частые первыми."""
+        return [
+            (sql, count) for sql, count in self.queries.most_common()
+            if count > 1
+        ]
+
+    def get_timings(self, end):
+        """Длительность этапов в миллисекундах."""
+        timings = {
+            'total': end - self.start,
+            'db': self.db_time,
+        }
+        if self.view_start is not None and self.view_end is not None:
+            # Время представления без запросов к БД - это в основном
+            # сериализация данных.
+            timings['serialize'] = (
+                self.view_end - self.view_start - self.view_db_time
+            )
+            timings['render'] = end - self.view_end
+        return {name: value * 1000 for name, value in timings.items()}
+
+
+class RequestProfilingMiddleware:
+    """Считает SQL-запросы и время этапов каждого запроса.
+
+    Включается настройкой REQUEST_PROFILING. Результат отдаётся
+    в заголовке Server-Timing и пишется в лог строкой JSON. Если один
+    и тот же запрос выполнен не меньше
+    REQUEST_PROFILING_DUPLICATE_THRESHOLD раз, строка пишется
+    с уровнем WARNING.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        request.profile = profile
+        with profile.capture():
+            response = self.get_response(request)
+        if response.streaming:
+            # Список покупок формируется и читает БД уже при отдаче.
+            response.streaming_content = self.stream(
+                request, response, profile, response.streaming_content
+            )
+        else:
+            self.finish(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.profile.start_view()
+
+    def process_template_response(self, request, response):
+        request.profile.end_view()
+        return response
+
+    def stream(self, request, response, profile, content):
+        with profile.capture():
+            yield from content
+        self.log(request, response, profile, time.perf_counter())
+
+    def finish(self, request, response, profile):
+        end = time.perf_counter()
+        timings = profile.get_timings(end)
+        queries = sum(profile.queries.values())
+        duplicates = profile.get_duplicates()
+        response['Server-Timing'] = ', '.join(
+            [
+                f'db;dur={timings["db"]:.1f};desc="{queries} queries, '
+                f'{len(duplicates)} repeated"',
+            ] + [
+                f'{name};dur={timings[name]:.1f}'
+                for name in ('serialize', 'render', 'total')
+                if name in timings
+            ]
+        )
+        self.log(request, response, profile, end)
+
+    def log(self, request, response, profile, end):
+        duplicates = profile.get_duplicates()
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': sum(profile.queries.values()),
+            **{
+                f'{name}_ms': round(value, 2)
+                for name, value in profile.get_timings(end).items()
+            },
+            'duplicates': [
+                {'sql': sql[:300], 'count': count}
+                for sql, count in duplicates[:3]
+            ],
+        }
+        level = logging.INFO
+        if (
+            duplicates and duplicates[0][1]
+            >= settings.REQUEST_PROFILING_DUPLICATE_THRESHOLD
+        ):
+            level = logging.WARNING
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+
+
+class MetricsMiddleware:
+    """Собирает метрики запросов для /metrics.
+
+    Маршрут берётся из имени URL, чтобы число меток не зависело
+    от параметров адреса. Включается настройкой METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        with profile.capture():
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response, profile, response.streaming_content
+            )
+        else:
+            self.record(request, response, profile)
+        return response
+
+    def stream(self, request, response, profile, content):
+        with profile.capture():
+            yield from content
+        self.record(request, response, profile)
+
+    def record(self, request, response, profile):
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        REQUESTS.inc(
+            route=route, method=request.method,
+            status=str(response.status_code),
+        )
+        REQUEST_DURATION.observe(
+            time.perf_counter() - profile.start,
+            route=route, method=request.method,
+        )
+        DB_QUERIES.observe(sum(profile.queries.values()), route=route)
+        DB_DURATION.observe(profile.db_time, route=route)
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=64, unique=True, verbose_name='Ресурс')),
+                ('version', models.BigIntegerField(verbose_name='Поколение')),
+                ('body', models.BinaryField(verbose_name='JSON')),
+                ('gzipped', models.BinaryField(verbose_name='JSON в gzip')),
+            ],
+            options={
+                'verbose_name': 'Готовый список',
+                'verbose_name_plural': 'Готовые списки',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import models
+
+
+class DataVersion(models.Model):
+    """Поколение данных ресурса для ETag и ключей кэша ответов.
+
+    Хранится в базе, поэтому одинаково во всех процессах и не
+    пропадает вместе с записями кэша.
+    """
+
+    resource = models.CharField('Ресурс', max_length=64, unique=True)
+    version = models.BigIntegerField('Поколение', default=0)
+
+    class Meta:
+        verbose_name = 'Поколение данных'
+        verbose_name_plural = 'Поколения данных'
+
+    def __str__(self):
+        return f'{self.resource}: {self.version}'
+
+
+class Payload(models.Model):
+    """Готовый JSON-список ресурса и его gzip-версия.
+
+    Хранится в базе, чтобы список, собранный командой build_payloads
+    или одним из процессов, был виден всем процессам.
+    """
+
+    resource = models.CharField('Ресурс', max_length=64, unique=True)
+    version = models.BigIntegerField('Поколение')
+    body = models.BinaryField('JSON')
+    gzipped = models.BinaryField('JSON в gzip')
+
+    class Meta:
+        verbose_name = 'Готовый список'
+        verbose_name_plural = 'Готовые списки'
+
+    def __str__(self):
+        return f'{self.resource}: {self.version}'
@@ -1,4 +1,7 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound, ValidationError
 
 
 class CustomPagination(pagination.PageNumberPagination):
@@ -6,3 +9,114 @@ class CustomPagination(pagination.PageNumberPagination):
 
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(pagination.CursorPagination):
+    """Пагинация ленты рецептов по курсору (pub_date, id).
+
+    В курсоре хранятся дата публикации и id крайнего рецепта страницы.
+    Соседняя страница выбирается условием по обоим полям, поэтому
+    рецепты с одинаковой датой не пропускаются и смещение не нужно.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+    @staticmethod
+    def get_position(pub_date, pk):
+        return f'{pub_date.isoformat()}|{pk}'
+
+    def _get_position_from_instance(self, instance, ordering):
+        return self.get_position(instance.pub_date, instance.pk)
+
+    def get_keyset_filter(self, position, reverse):
+        """Рецепты после позиции курсора в порядке ленты или,
+        для обратного курсора, перед ней."""
+        pub_date, _, pk = position.rpartition('|')
+        try:
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'gt' if reverse else 'lt'
+        return Q(**{f'pub_date__{lookup}': pub_date}) | Q(
+            pub_date=pub_date, **{f'id__{lookup}': pk}
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor and self.cursor.position
+        queryset = queryset.order_by(
+            *(('pub_date', 'id') if reverse else self.ordering)
+        )
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(position, reverse)
+            )
+        # Лишний рецепт показывает, есть ли страница дальше.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > self.page_size:
+            following = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = (
+                position is not None, position
+            )
+            self.has_previous, self.previous_position = (
+                following is not None, following
+            )
+        else:
+            self.has_next, self.next_position = (
+                following is not None, following
+            )
+            self.has_previous, self.previous_position = (
+                position is not None, position
+            )
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+
+class RecipePagination(CustomPagination):
+    """Постраничная пагинация ленты рецептов.
+
+    С параметром pagination=cursor или cursor переключается
+    на пагинацию по курсору без подсчёта общего числа рецептов.
+    Курсор идёт по дате публикации, поэтому вместе с ordering=popular
+    не используется.
+    """
+
+    cursor_pagination_class = RecipeCursorPagination
+    cursor_paginator = None
+
+    def is_cursor_mode(self, request):
+        params = request.query_params
+        return (
+            params.get('pagination') == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_mode(request):
+            if request.query_params.get('ordering') == 'popular':
+                raise ValidationError(
+                    'Сортировка popular недоступна при пагинации по курсору!'
+                )
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,113 @@
+import gzip
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from api.cache import INGREDIENTS, TAGS, get_generation
+from api.models import Payload
+from api.serializers import IngredientSerializer, TagSerializer
+from recipes.models import Ingredient, Tag
+
+PAYLOAD_SOURCES = {
+    TAGS: (Tag, TagSerializer),
+    INGREDIENTS: (Ingredient, IngredientSerializer),
+}
+
+_payloads = {}
+
+
+def accepts_gzip(accept_encoding):
+    """Разрешает ли заголовок Accept-Encoding ответ в gzip.
+
+    Кодировка с q=0 запрещена, gzip без отдельной записи
+    разрешает «*».
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+def build_payload(resource):
+    """Сериализует полный список и возвращает JSON и его gzip-версию."""
+    model, serializer_class = PAYLOAD_SOURCES[resource]
+    body = JSONRenderer().render(
+        serializer_class(model.objects.all(), many=True).data
+    )
+    return body, gzip.compress(body)
+
+
+def store_payload(resource, generation=None):
+    """Собирает список заново и сохраняет его для текущего поколения."""
+    if generation is None:
+        generation = get_generation(resource)
+    payload = build_payload(resource)
+    body, gzipped = payload
+    Payload.objects.update_or_create(
+        resource=resource,
+        defaults={'version': generation, 'body': body, 'gzipped': gzipped},
+    )
+    _payloads[resource] = (generation, payload)
+    return payload
+
+
+def get_payload(resource, generation=None):
+    """Готовый список для текущего поколения данных ресурса.
+
+    Список ищется в памяти процесса, затем в базе и только потом
+    собирается заново.
+    """
+    if generation is None:
+        generation = get_generation(resource)
+    cached = _payloads.get(resource)
+    if cached and cached[0] == generation:
+        return cached[1]
+    stored = Payload.objects.filter(
+        resource=resource, version=generation
+    ).values_list('body', 'gzipped').first()
+    if stored is None:
+        return store_payload(resource, generation)
+    payload = tuple(map(bytes, stored))
+    _payloads[resource] = (generation, payload)
+    return payload
+
+
+class PrebuiltListMixin:
+    """Отдаёт нефильтрованный список готовыми байтами JSON."""
+
+    payload_resource = None
+    payload_generation = None
+
+    def get_payload_generation(self):
+        """Поколение списка, читается из базы один раз за запрос."""
+        if self.payload_generation is None:
+            self.payload_generation = get_generation(self.payload_resource)
+        return self.payload_generation
+
+    def list(self, request, *args, **kwargs):
+        if (
+            set(request.query_params) - {'format'}
+            or request.accepted_renderer.format != 'json'
+            or request.accepted_media_type != JSONRenderer.media_type
+        ):
+            return super().list(request, *args, **kwargs)
+        body, gzipped = get_payload(
+            self.payload_resource, self.get_payload_generation()
+        )
+        if accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(gzipped, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
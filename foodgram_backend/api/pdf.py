@@ -0,0 +1,268 @@
+import zlib
+from functools import lru_cache
+from io import BytesIO
+
+from fontTools.subset import Options, Subsetter
+from fontTools.ttLib import TTFont, TTLibError
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 12
+LEADING = 16
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+# Ширина строки в единицах глифов (1000 на кегль).
+LINE_WIDTH = (PAGE_WIDTH - 2 * MARGIN) * 1000 // FONT_SIZE
+# Имя встроенного подмножества шрифта: шесть заглавных букв и «+».
+FONT_NAME = b'FGSHOP+ShoppingListFont'
+
+CATALOG, PAGES, FONT, CID_FONT, DESCRIPTOR, FONT_FILE, TO_UNICODE = range(
+    1, 8
+)
+FIRST_PAGE_OBJECT = 8
+
+
+class FontError(Exception):
+    """Шрифт для PDF не найден или не подходит."""
+
+
+class TrueTypeFont:
+    """TrueType-шрифт для встраивания в PDF.
+
+    В документ встраивается только подмножество шрифта с глифами,
+    которые в нём использованы. Номера глифов при этом сохраняются.
+    """
+
+    def __init__(self, path):
+        try:
+            with open(path, 'rb') as font_file:
+                self.data = font_file.read()
+            font = TTFont(BytesIO(self.data))
+        except (OSError, TTLibError) as error:
+            raise FontError(f'Не удалось загрузить шрифт {path}: {error}')
+        if 'glyf' not in font:
+            raise FontError(f'Шрифт {path} не в формате TrueType.')
+        cmap = font.getBestCmap()
+        if not cmap:
+            raise FontError(f'В шрифте {path} нет таблицы символов Unicode.')
+        head = font['head']
+        self.units_per_em = head.unitsPerEm
+        self.bbox = [
+            self.scale(value)
+            for value in (head.xMin, head.yMin, head.xMax, head.yMax)
+        ]
+        self.ascent = self.scale(font['hhea'].ascent)
+        self.descent = self.scale(font['hhea'].descent)
+        order = font.getGlyphOrder()
+        glyph_ids = {name: glyph for glyph, name in enumerate(order)}
+        self.cmap = {code: glyph_ids[name] for code, name in cmap.items()}
+        hmtx = font['hmtx']
+        self.advances = [hmtx[name][0] for name in order]
+
+    def scale(self, value):
+        return value * 1000 // self.units_per_em
+
+    def glyph(self, char):
+        return self.cmap.get(ord(char), 0)
+
+    def width(self, glyph):
+        return self.scale(self.advances[min(glyph, len(self.advances) - 1)])
+
+    @lru_cache(maxsize=64)
+    def subset(self, glyphs):
+        """Файл шрифта только с глифами glyphs (frozenset номеров)."""
+        options = Options()
+        options.retain_gids = True
+        options.notdef_outline = True
+        options.hinting = False
+        options.layout_features = []
+        font = TTFont(BytesIO(self.data))
+        subsetter = Subsetter(options)
+        subsetter.populate(gids=glyphs | {0})
+        subsetter.subset(font)
+        output = BytesIO()
+        font.save(output)
+        return output.getvalue()
+
+
+@lru_cache(maxsize=None)
+def load_font(path):
+    """Загружает шрифт один раз на процесс."""
+    return TrueTypeFont(path)
+
+
+def wrap_line(line, font):
+    """Разбивает строку на части не шире страницы.
+
+    Строка переносится по последнему пробелу, который помещается,
+    слово длиннее строки переносится по буквам.
+    """
+    widths = [font.width(font.glyph(char)) for char in line]
+    parts = []
+    start = 0
+    width = 0
+    space = None
+    for index, char in enumerate(line):
+        if width + widths[index] > LINE_WIDTH and index > start:
+            if space is None:
+                parts.append(line[start:index])
+                start = index
+            else:
+                # Пробел на месте переноса не печатается.
+                parts.append(line[start:space])
+                start = space + 1
+            width = sum(widths[start:index])
+            space = None
+        if char == ' ' and index > start:
+            space = index
+        width += widths[index]
+    parts.append(line[start:])
+    return parts
+
+
+def _object(number, body):
+    return f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+
+
+def _stream(number, data, extra=b''):
+    data = zlib.compress(data)
+    return _object(
+        number,
+        b'<< /Length %d /Filter /FlateDecode %s>>\nstream\n' % (
+            len(data), extra
+        ) + data + b'\nendstream'
+    )
+
+
+def _page_content(lines, font, used):
+    commands = [
+        b'BT',
+        b'/F1 %d Tf' % FONT_SIZE,
+        b'%d TL' % LEADING,
+        b'%d %d Td' % (MARGIN, PAGE_HEIGHT - MARGIN - FONT_SIZE),
+    ]
+    for line in lines:
+        glyphs = []
+        for char in line:
+            glyph = font.glyph(char)
+            used.setdefault(glyph, char)
+            glyphs.append(glyph)
+        text = ''.join(f'{glyph:04X}' for glyph in glyphs)
+        commands.append(f'<{text}> Tj T*'.encode())
+    commands.append(b'ET')
+    return b'\n'.join(commands)
+
+
+def _to_unicode(used):
+    entries = [
+        f'<{glyph:04X}> <{ord(char):04X}>'
+        for glyph, char in sorted(used.items()) if ord(char) <= 0xFFFF
+    ]
+    blocks = []
+    for start in range(0, len(entries), 100):
+        chunk = entries[start:start + 100]
+        blocks.append(
+            f'{len(chunk)} beginbfchar\n' + '\n'.join(chunk) + '\nendbfchar'
+        )
+    return (
+        '/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n'
+        '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) '
+        '/Supplement 0 >> def\n/CMapName /Adobe-Identity-UCS def\n'
+        '/CMapType 2 def\n1 begincodespacerange\n<0000> <FFFF>\n'
+        'endcodespacerange\n' + '\n'.join(blocks)
+        + '\nendcmap\nCMapName currentdict /CMap defineresource pop\n'
+        'end\nend'
+    ).encode()
+
+
+def _font_objects(font, used):
+    widths = ' '.join(
+        f'{glyph} [{font.width(glyph)}]' for glyph in sorted(used)
+    )
+    yield FONT, _object(FONT, (
+        b'<< /Type /Font /Subtype /Type0 /BaseFont /%s '
+        b'/Encoding /Identity-H /DescendantFonts [%d 0 R] '
+        b'/ToUnicode %d 0 R >>' % (FONT_NAME, CID_FONT, TO_UNICODE)
+    ))
+    yield CID_FONT, _object(CID_FONT, (
+        b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /%s '
+        b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) '
+        b'/Supplement 0 >> /FontDescriptor %d 0 R /CIDToGIDMap /Identity '
+        b'/W [%s] >>' % (FONT_NAME, DESCRIPTOR, widths.encode())
+    ))
+    yield DESCRIPTOR, _object(DESCRIPTOR, (
+        b'<< /Type /FontDescriptor /FontName /%s /Flags 32 '
+        b'/FontBBox [%s] /ItalicAngle 0 /Ascent %d /Descent %d '
+        b'/CapHeight %d /StemV 80 /FontFile2 %d 0 R >>' % (
+            FONT_NAME, ' '.join(map(str, font.bbox)).encode(),
+            font.ascent, font.descent, font.ascent, FONT_FILE
+        )
+    ))
+    data = font.subset(frozenset(used))
+    yield FONT_FILE, _stream(FONT_FILE, data, b'/Length1 %d ' % len(data))
+    yield TO_UNICODE, _stream(TO_UNICODE, _to_unicode(used))
+
+
+def generate_pdf(lines, font):
+    """Постранично формирует PDF-документ из строк текста.
+
+    Длинные строки переносятся по ширине глифов шрифта. Страницы
+    отдаются по мере заполнения, а шрифт, дерево страниц
+    и таблица ссылок дописываются в конце файла.
+    """
+    offsets = {}
+    position = 0
+    pages = []
+    used = {}
+
+    def write(number, chunk):
+        nonlocal position
+        offsets[number] = position
+        position += len(chunk)
+        return chunk
+
+    def flush(page_lines):
+        content = FIRST_PAGE_OBJECT + len(pages) * 2
+        page = content + 1
+        pages.append(page)
+        yield write(content, _stream(
+            content, _page_content(page_lines, font, used)
+        ))
+        yield write(page, _object(page, (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+            % (PAGES, PAGE_WIDTH, PAGE_HEIGHT, FONT, content)
+        )))
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(header)
+    yield header
+    page_lines = []
+    for line in lines:
+        for part in wrap_line(line.rstrip('\n'), font):
+            page_lines.append(part)
+            if len(page_lines) == LINES_PER_PAGE:
+                yield from flush(page_lines)
+                page_lines = []
+    if page_lines or not pages:
+        yield from flush(page_lines)
+
+    for number, chunk in _font_objects(font, used):
+        yield write(number, chunk)
+    kids = ' '.join(f'{page} 0 R' for page in pages).encode()
+    yield write(PAGES, _object(
+        PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(pages))
+    ))
+    yield write(CATALOG, _object(
+        CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES
+    ))
+
+    size = max(offsets) + 1
+    xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+    for number in range(1, size):
+        xref.append(b'%010d 00000 n \n' % offsets[number])
+    yield b''.join(xref)
+    yield (
+        b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+        % (size, CATALOG, position)
+    )
@@ -0,0 +1,149 @@
+import csv
+import json
+import logging
+
+from django.conf import settings
+from rest_framework import exceptions, renderers, status
+
+from api.pdf import FontError, generate_pdf, load_font
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer, использующий orjson, если он установлен.
+
+    Типы, которые orjson выводит по-своему (даты, Decimal, ленивые
+    строки), передаются стандартному кодировщику DRF, поэтому ответ
+    совпадает с JSONRenderer байт в байт. Форматированный вывод и всё,
+    что orjson не умеет кодировать, отдаются стандартному рендереру.
+    Отличаются только числа с плавающей точкой: orjson пишет их
+    в кратчайшей форме (1e16 вместо 1e+16), а NaN и Infinity заменяет
+    на null. Полей с такими числами в API нет.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None
+            or not (self.compact and self.strict and not self.ensure_ascii)
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(
+                b'\xe2\x80\xa8', b'\\u2028'
+            ).replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
+
+
+class ShoppingListUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Выгрузка списка покупок в этом формате недоступна.'
+    default_code = 'shopping_list_unavailable'
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    """Базовый класс выгрузки списка покупок.
+
+    Ответ формируется потоково методом stream, render используется
+    только для ответов с ошибками, которые отдаются в JSON.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json; charset=utf-8'
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def stream(self, user, rows):
+        """Возвращает итератор по частям файла."""
+        raise NotImplementedError
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок текстом."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def lines(self, user, rows):
+        yield 'Foodgram\n'
+        yield (f'Список покупок пользователя {user.first_name} '
+               f'{user.last_name}\n')
+        yield '\n'
+        for name, unit, total in rows:
+            yield f'{name} - {total} {unit}\n'
+
+    def stream(self, user, rows):
+        return self.lines(user, rows)
+
+
+class Echo:
+    """Буфер, сразу возвращающий записанное значение."""
+
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, user, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в формате JSON."""
+
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, user, rows):
+        separator = '['
+        for name, unit, total in rows:
+            yield separator + json.dumps(
+                {'name': name, 'measurement_unit': unit, 'amount': total},
+                ensure_ascii=False
+            )
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class PDFShoppingListRenderer(TextShoppingListRenderer):
+    """Список покупок в формате PDF, формируется постранично."""
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def stream(self, user, rows):
+        try:
+            font = load_font(settings.SHOPPING_LIST_PDF_FONT)
+        except FontError as error:
+            logger.error('%s Укажите шрифт в SHOPPING_LIST_PDF_FONT.', error)
+            raise ShoppingListUnavailable(
+                'Выгрузка в PDF недоступна: на сервере не найден шрифт. '
+                'Выберите другой формат.'
+            )
+        return generate_pdf(self.lines(user, rows), font)
@@ -1,12 +1,14 @@
-import base64
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.db import transaction
 from django.db.models import F
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator, ValidationError
 
-from api.utils import create_relation_ingredient_and_value
+from api.utils import (create_relation_ingredient_and_value,
+                       decode_base64_image, get_image_variants,
+                       get_media_url, update_relation_ingredient_and_value)
+from cart.utils import update_shopping_lists
 from recipes.constants import (MAX_AMOUNT, MAX_COOKING_TIME,
                                MIN_AMOUNT, MIN_COOKING_TIME)
 from recipes.models import Favourite, Ingredient, Recipe, Tag
@@ -18,9 +20,11 @@ class Base64ImageField(serializers.ImageField):
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            # Изображение уже проверено при декодировании, а проверка
+            # ImageField скопировала бы весь файл в память.
+            return serializers.FileField.to_internal_value(
+                self, decode_base64_image(data)
+            )
         return super().to_internal_value(data)
 
 
@@ -42,20 +46,68 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = '__all__',
 
 
+class IngredientCreateListSerializer(serializers.ListSerializer):
+    """Проверяет id всех ингредиентов рецепта одним запросом."""
+
+    def to_internal_value(self, data):
+        result = super().to_internal_value(data)
+        ingredients = Ingredient.objects.in_bulk(
+            {item['id'] for item in result}
+        )
+        errors = [
+            {} if item['id'] in ingredients else {'id': [
+                serializers.PrimaryKeyRelatedField.default_error_messages[
+                    'does_not_exist'
+                ].format(pk_value=item['id'])
+            ]}
+            for item in result
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+        for item in result:
+            item['id'] = ingredients[item['id']]
+        return result
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Проверяет первичные ключи всех объектов одним запросом.
+
+    Значения, которые не являются целыми числами, проверяются
+    обычным способом, чтобы ошибки остались прежними.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        objects = self.child_relation.get_queryset().in_bulk({
+            pk for pk in data if type(pk) is int
+        })
+        return [
+            objects[pk] if type(pk) is int and pk in objects
+            else self.child_relation.to_internal_value(pk)
+            for pk in data
+        ]
+
+
 class IngredientCreateSerializer(serializers.Serializer):
     """Сериализатор для ингредиентов при создании рецепта."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         max_value=MAX_AMOUNT, min_value=MIN_AMOUNT
     )
 
+    class Meta:
+        list_serializer_class = IngredientCreateListSerializer
+
 
 class RecipeForUserSerializer(serializers.ModelSerializer):
     """Сериализатор для рецептов эндпоинта подписок."""
 
+    image = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
         fields = (
@@ -63,6 +115,16 @@ class RecipeForUserSerializer(serializers.ModelSerializer):
         )
         read_only_fields = '__all__',
 
+    def get_image(self, obj):
+        """Миниатюра изображения, пока её нет - исходное изображение."""
+        request = self.context.get('request')
+        variants = get_image_variants(obj, request)
+        if variants is not None:
+            return variants['thumbnail']['jpeg']
+        if not obj.image:
+            return None
+        return get_media_url(obj.image.name, request)
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для вывода автора-владельца рецепта."""
@@ -82,6 +144,8 @@ class UserSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         if user.is_anonymous or user == obj:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return user.following.filter(following_user_id=obj).exists()
 
 
@@ -94,12 +158,14 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+            'is_in_shopping_cart', 'name', 'image', 'image_variants', 'text',
+            'cooking_time', 'favorites_count', 'in_carts_count',
         )
         read_only_fields = (
             '__all__',
@@ -107,13 +173,24 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_ingredients(self, obj):
         """Получение поля ингредиентов."""
-        ingrediens = obj.ingredients.values(
-            'id', 'name', 'measurement_unit', amount=F('recipe__amount')
-        )
-        return ingrediens
+        if not hasattr(obj, 'ingredient_values'):
+            return obj.ingredients.values(
+                'id', 'name', 'measurement_unit', amount=F('recipe__amount')
+            )
+        return [
+            {
+                'id': value.ingredients.id,
+                'name': value.ingredients.name,
+                'measurement_unit': value.ingredients.measurement_unit,
+                'amount': value.amount,
+            }
+            for value in obj.ingredient_values
+        ]
 
     def get_is_favorited(self, obj):
         """Получение поля в избранном ли товар."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -121,18 +198,74 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Получение поля в корзине ли товар."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return user.cart.filter(recipe=obj).exists()
 
+    def get_image_variants(self, obj):
+        """Получение ссылок на уменьшенные копии изображения."""
+        return get_image_variants(obj, self.context['request'])
+
+    def to_representation(self, instance):
+        """Для подготовленных for_read рецептов собирает словарь напрямую."""
+        if (
+            not settings.RECIPE_FAST_SERIALIZATION
+            or not hasattr(instance, 'ingredient_values')
+        ):
+            return super().to_representation(instance)
+        request = self.context['request']
+        user = request.user
+        author = instance.author
+        image = None
+        if instance.image:
+            image = request.build_absolute_uri(instance.image.url)
+        return {
+            'id': instance.id,
+            'tags': [
+                {
+                    'id': tag.id,
+                    'name': tag.name,
+                    'color': tag.color,
+                    'slug': tag.slug,
+                }
+                for tag in instance.tags.all()
+            ],
+            'author': {
+                'email': author.email,
+                'id': author.id,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+                'is_subscribed': (
+                    user.is_authenticated
+                    and user != author
+                    and author.is_subscribed
+                ),
+            },
+            'ingredients': self.get_ingredients(instance),
+            'is_favorited': instance.is_favorited,
+            'is_in_shopping_cart': instance.is_in_shopping_cart,
+            'name': instance.name,
+            'image': image,
+            'image_variants': get_image_variants(instance, request),
+            'text': instance.text,
+            'cooking_time': instance.cooking_time,
+            'favorites_count': instance.favorites_count,
+            'in_carts_count': instance.in_carts_count,
+        }
+
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для создания рецепта."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all())
+    tags = BulkManyRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=Tag.objects.all()
+        )
+    )
     image = Base64ImageField()
     ingredients = IngredientCreateSerializer(many=True,)
     cooking_time = serializers.IntegerField(
@@ -178,30 +311,42 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         """Функция создания рецепта."""
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
-
-        create_relation_ingredient_and_value(
-            ingredients_list=ingredients,
-            recipe=recipe
-        )
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            # Кэш ответов сбрасывает сигнал сохранения рецепта.
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe=recipe, tag=tag) for tag in tags
+            ])
+            create_relation_ingredient_and_value(
+                ingredients_list=ingredients,
+                recipe=recipe
+            )
         return recipe
 
     def update(self, instance, validated_data):
-        """Функция изменения рецепта."""
+        """Функция изменения рецепта.
+
+        Записываются только изменения тегов и ингредиентов.
+        """
         ingredients = validated_data.get('ingredients')
-        instance.tags.set(validated_data.get('tags'))
-        instance.image = validated_data.get('image')
-        instance.name = validated_data.get('name')
-        instance.text = validated_data.get('text')
-        instance.cooking_time = validated_data.get('cooking_time')
-        if ingredients:
-            instance.ingredients.clear()
-            create_relation_ingredient_and_value(
-                ingredients_list=ingredients,
-                recipe=instance
-            )
-        instance.save()
+        with transaction.atomic():
+            # set() добавляет и удаляет только отличающиеся теги.
+            instance.tags.set(validated_data.get('tags'))
+            instance.image = validated_data.get('image')
+            instance.name = validated_data.get('name')
+            instance.text = validated_data.get('text')
+            instance.cooking_time = validated_data.get('cooking_time')
+            if ingredients:
+                deltas = update_relation_ingredient_and_value(
+                    ingredients_list=ingredients,
+                    recipe=instance
+                )
+                if deltas:
+                    update_shopping_lists(
+                        instance.cart.values_list('user_id', flat=True),
+                        deltas
+                    )
+            instance.save()
         return instance
 
 
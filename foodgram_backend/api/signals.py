@@ -0,0 +1,106 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+
+from api.cache import INGREDIENTS, RECIPES, TAGS, invalidate, user_resource
+from api.payloads import get_payload
+from cart.models import Cart
+from recipes.models import (Favourite, Ingredient, Recipe,
+                            RecipeIngredientValue, Tag)
+from users.models import UserFollow
+
+User = get_user_model()
+
+# Поля автора, которые входят в ответы с рецептами.
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+def invalidate_on_commit(*resources):
+    for resource in resources:
+        transaction.on_commit(partial(invalidate, resource))
+
+
+def rebuild_payload_on_commit(resource):
+    """Собирает готовый список после сброса поколения, чтобы его
+    не собирали одновременно первые запросы во всех процессах.
+
+    Повторные вызовы в одной транзакции находят список в памяти."""
+    transaction.on_commit(partial(get_payload, resource))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredientValue)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes(sender, action='post', **kwargs):
+    """Сбрасывает кэш ответов при изменении данных рецептов."""
+    if action.startswith('post'):
+        invalidate_on_commit(RECIPES)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    """Сбрасывает кэш ингредиентов и рецептов."""
+    invalidate_on_commit(INGREDIENTS, RECIPES)
+    rebuild_payload_on_commit(INGREDIENTS)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """Сбрасывает кэш тегов и рецептов."""
+    invalidate_on_commit(TAGS, RECIPES)
+    rebuild_payload_on_commit(TAGS)
+
+
+def get_author_fields(user):
+    """Поля пользователя из ответов с рецептами.
+
+    Отложенные поля не читаются, чтобы не делать лишних запросов.
+    """
+    return tuple(user.__dict__.get(field) for field in AUTHOR_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_author_fields(sender, instance, **kwargs):
+    instance._author_fields = get_author_fields(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_on_author_change(sender, instance, created,
+                                update_fields=None, **kwargs):
+    """Сбрасывает кэш рецептов, если у автора изменились данные,
+    которые есть в ответах с рецептами.
+
+    Вход в систему, смена пароля и другие поля кэш не сбрасывают.
+    Удаление автора сбрасывает кэш через удаление его рецептов.
+    """
+    fields = get_author_fields(instance)
+    changed = fields != instance._author_fields
+    instance._author_fields = fields
+    if created or not changed or (
+        update_fields is not None
+        and not set(update_fields) & set(AUTHOR_FIELDS)
+    ):
+        return
+    if Recipe.objects.filter(author=instance).exists():
+        invalidate_on_commit(RECIPES)
+
+
+@receiver((post_save, post_delete), sender=Favourite)
+@receiver((post_save, post_delete), sender=Cart)
+def invalidate_user_recipes(sender, instance, **kwargs):
+    """Сбрасывает версию данных пользователя: избранное и корзину.
+
+    Вместе с ними меняются счётчики favorites_count и in_carts_count
+    рецепта, поэтому сбрасывается и кэш рецептов.
+    """
+    invalidate_on_commit(user_resource(instance.user_id), RECIPES)
+
+
+@receiver((post_save, post_delete), sender=UserFollow)
+def invalidate_user_follows(sender, instance, **kwargs):
+    """Сбрасывает версию данных пользователя при изменении подписок."""
+    invalidate_on_commit(user_resource(instance.user_id_id))
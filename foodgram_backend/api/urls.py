@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from api.views import (FavouritesViewSet, IngredientViewSet,
+from api.views import (CacheStatsView, FavouritesViewSet, IngredientViewSet,
                        RecipeViewSet, TagViewSet)
 from cart.views import CartAPI
 from users.views import UserViewSet
@@ -24,6 +24,7 @@ urlpatterns = [
         CartAPI.as_view(),
         name='cart'
     ),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('', include(router_v1.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,7 +1,32 @@
+import base64
+import binascii
+from collections import defaultdict
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from PIL import Image
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import exception_handler
 from rest_framework import status
 
-from recipes.models import RecipeIngredientValue
+from api.metrics import IMAGE_UPLOAD_SIZE
+from recipes.images import (get_ready_variants, has_metadata, image_storage,
+                            remove_metadata)
+from recipes.models import Recipe, RecipeIngredientValue
+
+# Размер куска base64 кратен 4, чтобы куски декодировались независимо.
+BASE64_CHUNK_SIZE = 256 * 1024
+# Форматы Pillow для каждого типа изображения. Снимки многих телефонов
+# сохраняются как MPO: это JPEG с дополнительными кадрами.
+IMAGE_TYPE_FORMATS = {
+    'image/jpeg': {'JPEG', 'MPO'},
+    'image/png': {'PNG'},
+    'image/webp': {'WEBP'},
+    'image/gif': {'GIF'},
+}
 
 
 def custom_exception_handler(exc, context):
@@ -24,3 +49,192 @@ def create_relation_ingredient_and_value(ingredients_list, recipe):
             amount=ingredient.get('amount')
         ))
     RecipeIngredientValue.objects.bulk_create(list_to_add)
+
+
+def update_relation_ingredient_and_value(ingredients_list, recipe):
+    """Применяет к ингредиентам рецепта только изменения.
+
+    Новые ингредиенты добавляются, убранные удаляются, у оставшихся
+    обновляется количество, если оно поменялось. Возвращает словарь
+    {id ингредиента: изменение количества}.
+    """
+    current = {
+        value.ingredients_id: value
+        for value in RecipeIngredientValue.objects.filter(recipe=recipe)
+    }
+    deltas = {}
+    list_to_add = []
+    list_to_update = []
+    for ingredient in ingredients_list:
+        ingredient_id = ingredient.get('id').id
+        amount = ingredient.get('amount')
+        value = current.pop(ingredient_id, None)
+        if value is None:
+            list_to_add.append(RecipeIngredientValue(
+                ingredients_id=ingredient_id,
+                recipe=recipe,
+                amount=amount
+            ))
+            deltas[ingredient_id] = amount
+        elif value.amount != amount:
+            deltas[ingredient_id] = amount - value.amount
+            value.amount = amount
+            list_to_update.append(value)
+    if current:
+        RecipeIngredientValue.objects.filter(
+            pk__in=[value.pk for value in current.values()]
+        ).delete()
+        for ingredient_id, value in current.items():
+            deltas[ingredient_id] = -value.amount
+    if list_to_update:
+        RecipeIngredientValue.objects.bulk_update(list_to_update, ['amount'])
+    if list_to_add:
+        RecipeIngredientValue.objects.bulk_create(list_to_add)
+    # Кэш ответов сбрасывает сигнал сохранения рецепта.
+    return deltas
+
+
+def get_shopping_list(user):
+    """Возвращает список покупок пользователя."""
+    return user.shopping_list.values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def get_recent_recipes(author_ids, limit=None):
+    """Возвращает последние рецепты авторов одним запросом.
+
+    Результат - словарь {id автора: список рецептов}, в каждом списке
+    не больше limit рецептов.
+    """
+    recipes = Recipe.objects.filter(author__in=author_ids).order_by(
+        '-pub_date', '-id'
+    ).only(
+        'id', 'name', 'image', 'image_variants', 'cooking_time', 'author_id'
+    )
+    if limit is not None:
+        ranked = recipes.annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('author')],
+                order_by=(F('pub_date').desc(), F('id').desc()),
+            )
+        ).order_by().values(
+            'id', 'name', 'image', 'image_variants', 'cooking_time',
+            'author_id', 'recipe_rank'
+        )
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE recipe_rank <= %s '
+            'ORDER BY author_id, recipe_rank',
+            (*params, limit)
+        )
+    result = defaultdict(list)
+    for recipe in recipes:
+        result[recipe.author_id].append(recipe)
+    return result
+
+
+def get_media_url(name, request=None):
+    """Ссылка на файл, абсолютная, если передан запрос."""
+    url = image_storage.url(name)
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def get_image_variants(recipe, request=None):
+    """Ссылки на уменьшенные копии изображения рецепта.
+
+    Пока копии не построены, возвращает None.
+    """
+    files = get_ready_variants(recipe)
+    if files is None:
+        return None
+    return {
+        variant: {
+            extension: get_media_url(name, request)
+            for extension, name in formats.items()
+        }
+        for variant, formats in files.items()
+    }
+
+
+def decode_base64_image(data):
+    """Декодирует изображение из data URL во временный файл.
+
+    Тип и размер проверяются до декодирования, base64 декодируется
+    кусками, а размеры изображения читаются из заголовка файла.
+    Изображение с EXIF или XMP пересохраняется без них: в EXIF снимков
+    бывают координаты съёмки.
+    """
+    start = data.find(';base64,', 0, 100)
+    if start == -1:
+        raise ValidationError('Неверный формат изображения!')
+    content_type = data[len('data:'):start]
+    if content_type not in settings.IMAGE_UPLOAD_ALLOWED_TYPES:
+        raise ValidationError('Недопустимый тип изображения!')
+    start += len(';base64,')
+    encoded_size = len(data) - start
+    if not encoded_size or encoded_size % 4:
+        raise ValidationError('Неверный формат изображения!')
+    size = encoded_size // 4 * 3
+    if data.endswith('=='):
+        size -= 2
+    elif data.endswith('='):
+        size -= 1
+    IMAGE_UPLOAD_SIZE.observe(size)
+    if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ValidationError('Изображение слишком большое!')
+
+    image_file = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    try:
+        for position in range(start, len(data), BASE64_CHUNK_SIZE):
+            image_file.write(base64.b64decode(
+                data[position:position + BASE64_CHUNK_SIZE], validate=True
+            ))
+        image_file.seek(0)
+        image = Image.open(image_file)
+        width, height = image.size
+        image_format = image.format
+        metadata = has_metadata(image)
+        image.verify()
+    except (binascii.Error, Image.DecompressionBombError, OSError,
+            SyntaxError, ValueError):
+        image_file.close()
+        raise ValidationError('Неверный формат изображения!')
+    formats = IMAGE_TYPE_FORMATS.get(content_type)
+    if formats is None:
+        formats = {
+            name for name, mime in Image.MIME.items() if mime == content_type
+        }
+    if image_format not in formats:
+        image_file.close()
+        raise ValidationError('Тип изображения не совпадает с указанным!')
+    if max(width, height) > settings.IMAGE_UPLOAD_MAX_DIMENSION:
+        image_file.close()
+        raise ValidationError('Изображение слишком большое!')
+    image_file.seek(0)
+    if metadata:
+        original = image_file
+        image_file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        try:
+            remove_metadata(original, image_file)
+        except (Image.DecompressionBombError, OSError, SyntaxError,
+                ValueError):
+            image_file.close()
+            raise ValidationError('Неверный формат изображения!')
+        finally:
+            original.close()
+        size = image_file.tell()
+        image_file.seek(0)
+    return UploadedFile(
+        image_file,
+        name='image.' + content_type.split('/')[-1],
+        content_type=content_type,
+        size=size,
+    )
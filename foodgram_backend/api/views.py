@@ -1,31 +1,64 @@
 from django.contrib.auth import get_user_model
-from django.http.response import HttpResponse
+from django.db import transaction
+from django.http.response import (HttpResponse, HttpResponseForbidden,
+                                  StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-
+from rest_framework.views import APIView
+
+from api.cache import (INGREDIENTS, RECIPES, TAGS, AnonymousCacheMixin,
+                       ConditionalGetMixin, get_generation, get_generations,
+                       get_stats, user_resource)
+from api.metrics import CONTENT_TYPE, has_access, render
+from api.pagination import RecipePagination
+from api.payloads import PrebuiltListMixin
 from api.permissions import IsOwnerOrReadOnly
+from api.renderers import (CSVShoppingListRenderer, JSONShoppingListRenderer,
+                           PDFShoppingListRenderer, TextShoppingListRenderer)
 from api.serializers import (FavouriteSerializer, IngredientSerializer,
                              RecipeReadSerializer, RecipeWriteSerializer,
                              TagSerializer)
-from recipes.models import (Favourite, Ingredient, Recipe,
-                            RecipeIngredientValue, Tag)
+from api.utils import get_shopping_list
+from recipes.models import Favourite, Ingredient, Recipe, Tag
+from recipes.search import get_search_backend
 
 User = get_user_model()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                    viewsets.ModelViewSet):
     """Получить список или рецепт с возможностью редакт-я и удаления."""
 
     queryset = Recipe.objects.all()
     serializer_class = RecipeWriteSerializer
+    pagination_class = RecipePagination
     permission_classes = (
         IsOwnerOrReadOnly,
     )
+    conditional_actions = ('retrieve',)
+
+    def get_etag_parts(self, request):
+        """Версия рецепта: поколение данных, счётчики и данные юзера."""
+        try:
+            counters = Recipe.objects.filter(
+                pk=self.kwargs['pk']
+            ).values_list('favorites_count', 'in_carts_count').first()
+        except ValueError:
+            return None
+        if counters is None:
+            return None
+        user = request.user
+        if not user.is_authenticated:
+            return (get_generation(RECIPES), *counters)
+        generations = get_generations(RECIPES, user_resource(user.id))
+        return (generations[0], *counters, user.id, generations[1])
 
     def get_queryset(self):
         queryset = self.queryset
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.for_read(self.request.user)
         tags = self.request.query_params.getlist('tags')
         if tags:
             queryset = queryset.filter(tags__slug__in=tags).distinct()
@@ -34,8 +67,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if author:
             queryset = queryset.filter(author=author)
 
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = get_search_backend().search_recipes(queryset, search)
+
+        if self.request.query_params.get('ordering') == 'popular':
+            queryset = queryset.order_by('-favorites_count', '-pub_date')
+
         if self.request.user.is_anonymous:
-            return Recipe.objects.all()
+            return queryset
 
         is_favorited = self.request.query_params.get('is_favorited')
         if is_favorited:
@@ -83,66 +123,64 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=False,
         permission_classes=(permissions.IsAuthenticated,),
         methods=['get'],
+        renderer_classes=(
+            TextShoppingListRenderer, CSVShoppingListRenderer,
+            JSONShoppingListRenderer, PDFShoppingListRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        """Загрузить файл со списком покупок."""
+        """Загрузить файл со списком покупок.
+
+        Формат выбирается параметром format (txt, csv, json, pdf)
+        или заголовком Accept.
+        """
         user = request.user
-        amount_result = {}
-        ingredients = RecipeIngredientValue.objects.filter(
-            recipe__cart__user=user
-        ).values_list(
-            'ingredients__name',
-            'ingredients__measurement_unit',
-            'amount'
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(user, get_shopping_list(user).iterator()),
+            content_type=content_type
         )
-        for name, m_unit, amount in ingredients:
-            if name not in amount_result:
-                amount_result[name] = [
-                    m_unit, amount
-                ]
-            else:
-                amount_result[name][1] += amount
-
-        filename = f'{user.username}_shopping_list.txt'
-        text = [
-            'Foodgram\n',
-            (f'Список покупок пользователя {user.first_name} '
-             f'{user.last_name}\n'),
-            '\n'
-        ]
-        for name, [unit, value] in amount_result.items():
-            text.append(f'{name} - {value} {unit}\n')
-        response = HttpResponse(
-            text, content_type=f'{filename}; charset=utf-8'
+        response['Content-Disposition'] = (
+            'attachment; '
+            f'filename="{user.username}_shopping_list.{renderer.format}"'
         )
         return response
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, PrebuiltListMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Возвращает ингредиент или список ингредиентов. """
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
+    payload_resource = INGREDIENTS
+
+    def get_etag_parts(self, request):
+        return (self.get_payload_generation(),)
 
     def get_queryset(self):
         """Фильтрация ингредиентов."""
-        queryset = Ingredient.objects.all()
         name = self.request.query_params.get('name')
         if name:
-            queryset_first = queryset.filter(name__istartswith=name)
-            queryset_second = queryset.filter(name__icontains=name)
-            queryset = set(queryset_first) | set(queryset_second)
-            return list(queryset)
-        return queryset
+            return get_search_backend().search_ingredients(name)
+        return Ingredient.objects.all()
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, PrebuiltListMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Возвращает тег или список тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    payload_resource = TAGS
+
+    def get_etag_parts(self, request):
+        return (self.get_payload_generation(),)
 
 
 class FavouritesViewSet(generics.CreateAPIView, generics.DestroyAPIView):
@@ -170,7 +208,8 @@ class FavouritesViewSet(generics.CreateAPIView, generics.DestroyAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        result = Favourite.objects.create(recipe=recipe, user=user)
+        with transaction.atomic():
+            result = Favourite.objects.create(recipe=recipe, user=user)
         serializer = FavouriteSerializer(result)
         return Response(
             serializer.data,
@@ -192,3 +231,23 @@ class FavouritesViewSet(generics.CreateAPIView, generics.DestroyAPIView):
             {'message': 'Рецепт удален из избранного!'},
             status=status.HTTP_204_NO_CONTENT
         )
+
+
+class CacheStatsView(APIView):
+    """Статистика кэша ответов для анонимных пользователей."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_stats())
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus.
+
+    Адрес не проксируется nginx. Внутри сети сервиса метрики отдаются
+    только разрешённым адресам или по токену, см. has_access.
+    """
+    if not has_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from cart.models import ShoppingListItem
+from cart.utils import calculate_shopping_lists
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт списков покупок по рецептам в корзинах. '
+            'С флагом --check только сверяет данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить списки покупок, не изменяя их.',
+        )
+
+    def handle(self, *args, **options):
+        expected = calculate_shopping_lists()
+        actual = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in (
+                ShoppingListItem.objects.values_list(
+                    'user_id', 'ingredient_id', 'total_amount'
+                ).order_by()
+            )
+        }
+        mismatches = {
+            key for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        }
+        self.stdout.write(
+            f'Проверено записей: {len(expected)}, '
+            f'расхождений: {len(mismatches)}.'
+        )
+        if options['check']:
+            if mismatches:
+                raise CommandError('Списки покупок не совпадают с корзинами!')
+            return
+
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=total,
+                    )
+                    for (user_id, ingredient_id), total in expected.items()
+                ),
+                batch_size=1000,
+            )
+        self.stdout.write('Списки покупок пересчитаны!')
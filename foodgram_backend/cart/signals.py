@@ -0,0 +1,51 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from cart.models import Cart
+from cart.utils import get_recipe_amounts, update_shopping_lists
+from recipes.models import Recipe
+
+
+@receiver(post_save, sender=Cart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта в список покупок."""
+    if created:
+        update_shopping_lists(
+            [instance.user_id], get_recipe_amounts(instance.recipe_id)
+        )
+
+
+@receiver(pre_delete, sender=Cart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    """Вычитает ингредиенты рецепта из списка покупок.
+
+    Срабатывает до удаления, поэтому учитывает и каскадное удаление
+    рецепта вместе с его ингредиентами.
+    """
+    update_shopping_lists(
+        [instance.user_id],
+        {
+            ingredient_id: -amount
+            for ingredient_id, amount in get_recipe_amounts(
+                instance.recipe_id
+            ).items()
+        }
+    )
+
+
+@receiver(post_save, sender=Cart)
+def increase_in_carts_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик корзин у рецепта."""
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            in_carts_count=F('in_carts_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Cart)
+def decrease_in_carts_count(sender, instance, **kwargs):
+    """Уменьшает счётчик корзин у рецепта."""
+    Recipe.objects.filter(
+        pk=instance.recipe_id, in_carts_count__gt=0
+    ).update(in_carts_count=F('in_carts_count') - 1)
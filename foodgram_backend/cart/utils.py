@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from cart.models import ShoppingListItem
+from recipes.models import RecipeIngredientValue
+
+
+def get_recipe_amounts(recipe_id):
+    """Возвращает количество каждого ингредиента рецепта."""
+    return dict(
+        RecipeIngredientValue.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredients_id', 'amount')
+    )
+
+
+def update_shopping_lists(user_ids, deltas):
+    """Изменяет суммы ингредиентов в списках покупок пользователей.
+
+    deltas - словарь {id ингредиента: изменение количества}.
+    Недостающие строки сначала вставляются с нулём и ignore_conflicts,
+    а затем все суммы меняются одним UPDATE через F(), поэтому
+    параллельные добавления одного ингредиента не конфликтуют
+    и не теряются, а число запросов не зависит от рецепта.
+    """
+    user_ids = sorted(set(user_ids))
+    groups = defaultdict(list)
+    for ingredient_id, delta in deltas.items():
+        if delta:
+            groups[delta].append(ingredient_id)
+    if not user_ids or not groups:
+        return
+    added = sorted(
+        ingredient_id for ingredient_id, delta in deltas.items() if delta > 0
+    )
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=0,
+                )
+                for user_id in user_ids
+                for ingredient_id in added
+            ),
+            ignore_conflicts=True,
+        )
+        items = ShoppingListItem.objects.filter(user_id__in=user_ids)
+        change = Case(
+            *(
+                When(ingredient_id__in=ids, then=Value(delta))
+                for delta, ids in groups.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        items.filter(
+            ingredient_id__in=[
+                ingredient_id for ids in groups.values()
+                for ingredient_id in ids
+            ]
+        ).update(total_amount=F('total_amount') + change)
+        if min(groups) < 0:
+            items.filter(total_amount__lte=0).delete()
+
+
+def calculate_shopping_lists(user_ids=None):
+    """Считает списки покупок по рецептам в корзинах.
+
+    Возвращает словарь {(id пользователя, id ингредиента): количество}.
+    """
+    if user_ids is None:
+        values = RecipeIngredientValue.objects.filter(
+            recipe__cart__user_id__isnull=False
+        )
+    else:
+        values = RecipeIngredientValue.objects.filter(
+            recipe__cart__user_id__in=user_ids
+        )
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in values.values_list(
+            'recipe__cart__user_id', 'ingredients_id'
+        ).annotate(total=Sum('amount')).order_by()
+    }
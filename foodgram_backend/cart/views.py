@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -26,7 +27,8 @@ class CartAPI(APIView):
                 {'message': 'Рецепт уже добавлен!'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Cart.objects.create(recipe=recipe, user=user)
+        with transaction.atomic():
+            Cart.objects.create(recipe=recipe, user=user)
         serialazer = RecipeForUserSerializer(recipe)
         return Response(
             serialazer.data,
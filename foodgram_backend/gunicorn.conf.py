@@ -0,0 +1,11 @@
+import os
+
+
+def on_starting(server):
+    """Удаляет файлы метрик прошлого запуска до старта воркеров,
+    иначе их значения суммировались бы с новыми."""
+    directory = os.getenv('METRICS_DIR')
+    if directory:
+        from api.metrics import clear_directory
+
+        clear_directory(directory)
@@ -38,4 +38,4 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='В избранном')
     def get_favorite_count(self, obj):
-        return obj.fav_recipes.count()
+        return obj.favorites_count
@@ -6,3 +6,19 @@ MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 32_000
 MIN_AMOUNT = 1
 MAX_AMOUNT = 32_000
+INGREDIENT_SEARCH_LIMIT = 50
+SEARCH_CONFIG = 'russian'
+IMAGE_VARIANTS = (
+    ('medium', (800, 800)),
+    ('thumbnail', (300, 300)),
+)
+IMAGE_FORMATS = (
+    ('webp', 'WEBP'),
+    ('jpeg', 'JPEG'),
+)
+IMAGE_QUALITY = 80
+# Качество пересохранения загруженного изображения без метаданных.
+IMAGE_ORIGINAL_QUALITY = 95
+# Ключи Image.info с метаданными: EXIF (в том числе GPS) и XMP.
+IMAGE_METADATA = ('exif', 'xmp', 'XML:com.adobe.xmp')
+IMAGE_VARIANTS_DIR = 'recipes/variants/'
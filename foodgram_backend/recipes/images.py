@@ -0,0 +1,174 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from recipes.constants import (IMAGE_FORMATS, IMAGE_METADATA,
+                               IMAGE_ORIGINAL_QUALITY, IMAGE_QUALITY,
+                               IMAGE_VARIANTS, IMAGE_VARIANTS_DIR)
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+image_storage = Recipe._meta.get_field('image').storage
+
+_executor = None
+_executor_lock = Lock()
+
+
+def needs_variants(recipe):
+    """Проверяет, нужно ли строить копии изображения рецепта."""
+    return bool(recipe.image) and (
+        recipe.image_variants.get('source') != recipe.image.name
+    )
+
+
+def get_ready_variants(recipe):
+    """Возвращает имена файлов готовых копий изображения или None.
+
+    Копии считаются готовыми, только если они построены
+    из текущего изображения рецепта.
+    """
+    if not recipe.image or needs_variants(recipe):
+        return None
+    return recipe.image_variants['files']
+
+
+def has_metadata(image):
+    """Проверяет, есть ли в открытом изображении EXIF или XMP."""
+    return any(key in image.info for key in IMAGE_METADATA)
+
+
+def remove_metadata(image_file, output):
+    """Пересохраняет изображение из image_file в output без EXIF и XMP.
+
+    Поворот из EXIF применяется к пикселям, чтобы изображение
+    выглядело как раньше. Снимок MPO сохраняется как JPEG
+    из первого кадра.
+    """
+    image = Image.open(image_file)
+    image_format = 'JPEG' if image.format == 'MPO' else image.format
+    animated = image_format != 'JPEG' and getattr(image, 'is_animated', False)
+    if not animated:
+        image = ImageOps.exif_transpose(image)
+    for key in IMAGE_METADATA:
+        image.info.pop(key, None)
+    image.save(
+        output, image_format, quality=IMAGE_ORIGINAL_QUALITY,
+        save_all=animated,
+    )
+
+
+def _open_image(name):
+    with image_storage.open(name) as image_file:
+        image = Image.open(image_file)
+        # JPEG сразу декодируется в уменьшенном виде.
+        image.draft('RGB', IMAGE_VARIANTS[0][1])
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.load()
+    return image
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    # Метаданные исходного файла (EXIF, ICC) в копии не переносятся.
+    image.save(buffer, image_format, quality=IMAGE_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(name):
+    """Строит уменьшенные копии изображения во всех форматах.
+
+    Возвращает словарь {копия: {расширение: имя файла}}.
+    """
+    image = _open_image(name)
+    files = {}
+    # Копии идут от большей к меньшей, каждая уменьшается из предыдущей.
+    for variant, size in IMAGE_VARIANTS:
+        image.thumbnail(size, Image.LANCZOS)
+        files[variant] = {
+            extension: image_storage.save(
+                f'{IMAGE_VARIANTS_DIR}{variant}.{extension}',
+                _encode(image, image_format)
+            )
+            for extension, image_format in IMAGE_FORMATS
+        }
+    return files
+
+
+def process_recipe_image(recipe_id, force=False):
+    """Строит копии изображения рецепта и сохраняет их в рецепт."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants'
+    ).first()
+    if recipe is None or not recipe.image or not (
+        force or needs_variants(recipe)
+    ):
+        return
+    name = recipe.image.name
+    ready = Recipe.objects.filter(
+        image=name, image_variants__source=name
+    ).exclude(pk=recipe_id).values_list('image_variants', flat=True).first()
+    if ready is not None and not force:
+        # Такое же изображение уже обработано у другого рецепта.
+        files = ready['files']
+    else:
+        files = build_variants(name)
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id
+        ).only('image', 'image_variants').first()
+        # Если изображение заменили, пока строились копии, ненужные
+        # файлы удалит команда collect_recipe_images.
+        if recipe is None or recipe.image.name != name:
+            return
+        recipe.image_variants = {'source': name, 'files': files}
+        recipe.save(update_fields=['image_variants'])
+
+
+def _run(recipe_id, close_connection):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение рецепта %s.', recipe_id
+        )
+    finally:
+        if close_connection:
+            connection.close()
+
+
+def get_executor():
+    """Возвращает пул потоков обработки изображений."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                    thread_name_prefix='recipe-images',
+                )
+    return _executor
+
+
+def schedule_image_processing(recipe_id):
+    """Передаёт обработку изображения рецепта фоновому потоку.
+
+    При IMAGE_PROCESSING_WORKERS = 0 изображение обрабатывается сразу.
+    """
+    if settings.IMAGE_PROCESSING_WORKERS == 0:
+        _run(recipe_id, close_connection=False)
+    else:
+        get_executor().submit(_run, recipe_id, close_connection=True)
@@ -1,31 +1,249 @@
 import csv
+import json
+import re
+import time
+from collections import defaultdict
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.cache import INGREDIENTS, RECIPES, invalidate
+from recipes.constants import NAME_MAX_LENGTH, UNIT_MAX_LENGTH
 from recipes.models import Ingredient
+from recipes.search import ingredient_index
+
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if row == ['name', 'measurement_unit']:
+            continue
+        yield row[:2] if len(row) >= 2 else None
+
+
+def iter_json(file):
+    """Потоково читает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    end_of_file = False
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if position < len(buffer):
+            if not opened:
+                if buffer[position] != '[':
+                    raise ValueError('Ожидается JSON-массив.')
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise
+            else:
+                yield item
+                continue
+        if end_of_file:
+            raise ValueError('Неожиданный конец JSON-файла.')
+        chunk = file.read(JSON_CHUNK_SIZE)
+        end_of_file = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_jsonl(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_json_rows(items):
+    for item in items:
+        if isinstance(item, dict):
+            yield item.get('name'), item.get('measurement_unit')
+        else:
+            yield None
+
+
+READERS = {
+    'csv': iter_csv,
+    'json': lambda file: iter_json_rows(iter_json(file)),
+    'jsonl': lambda file: iter_json_rows(iter_jsonl(file)),
+}
 
 
 class Command(BaseCommand):
-    help = ('Импорт данных из csv файла в БД.'
-            'Перед импортом данных необходимо удалить БД.')
+    help = ('Импорт ингредиентов из файла csv, json или jsonl. '
+            'Файл читается потоково, ингредиенты добавляются пачками, '
+            'уже существующие пропускаются, поэтому импорт можно '
+            'запускать повторно. Если у ингредиента в базе и в файле '
+            'по одной единице измерения и они разные, единица в базе '
+            'заменяется на единицу из файла.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.BASE_DIR / 'data' / 'ingredients.csv',
+            type=Path,
+            help='Путь к файлу, по умолчанию data/ingredients.csv.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной пачке.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, какие ингредиенты будут добавлены '
+                 'и изменены.',
+        )
+
+    def read_rows(self, rows, stats):
+        """Очищает строки файла и отбрасывает неверные."""
+        for row in rows:
+            stats['rows'] += 1
+            if row is None:
+                stats['skipped'] += 1
+                continue
+            name, measurement_unit = (
+                value.strip() if isinstance(value, str) else ''
+                for value in row
+            )
+            if (
+                not name or not measurement_unit
+                or len(name) > NAME_MAX_LENGTH
+                or len(measurement_unit) > UNIT_MAX_LENGTH
+            ):
+                stats['skipped'] += 1
+                continue
+            yield name, measurement_unit
+
+    def import_batch(self, batch, dry_run, stats):
+        """Добавляет ингредиенты пачки, которых ещё нет в базе,
+        и обновляет изменившиеся единицы измерения.
+
+        Повторы отбрасываются в пределах пачки, чтобы память
+        не зависела от размера файла.
+        """
+        rows = list(dict.fromkeys(batch))
+        stats['duplicates'] += len(batch) - len(rows)
+        units = defaultdict(set)
+        for name, measurement_unit in rows:
+            units[name].add(measurement_unit)
+        stored = defaultdict(dict)
+        for pk, name, measurement_unit in Ingredient.objects.filter(
+            name__in=units
+        ).values_list('pk', 'name', 'measurement_unit'):
+            stored[name][measurement_unit] = pk
+        changed = {}
+        for name, file_units in units.items():
+            # Ингредиент с несколькими единицами в базе или в файле —
+            # это разные ингредиенты, их единицы не заменяются.
+            if len(file_units) != 1 or len(stored[name]) != 1:
+                continue
+            (old_unit, pk), = stored[name].items()
+            new_unit, = file_units
+            if new_unit != old_unit:
+                changed[name] = (pk, old_unit, new_unit)
+        new = [
+            (name, measurement_unit) for name, measurement_unit in rows
+            if name not in changed and measurement_unit not in stored[name]
+        ]
+        if dry_run or self.verbosity > 1:
+            for name, measurement_unit in new:
+                self.stdout.write(f'+ {name}, {measurement_unit}')
+            for name, (_, old_unit, new_unit) in changed.items():
+                self.stdout.write(f'~ {name}, {old_unit} -> {new_unit}')
+        if (new or changed) and not dry_run:
+            with transaction.atomic():
+                Ingredient.objects.bulk_update(
+                    [
+                        Ingredient(pk=pk, measurement_unit=new_unit)
+                        for pk, _, new_unit in changed.values()
+                    ],
+                    ['measurement_unit'],
+                )
+                Ingredient.objects.bulk_create(
+                    [
+                        Ingredient(
+                            name=name, measurement_unit=measurement_unit
+                        )
+                        for name, measurement_unit in new
+                    ],
+                    ignore_conflicts=True,
+                )
+        stats['new'] += len(new)
+        stats['updated'] += len(changed)
 
     def handle(self, *args, **options):
-        self.stdout.write('Добавление базы данных!')
-        absolute_path = 'data'
-        file_name = 'ingredients.csv'
+        self.verbosity = options['verbosity']
+        path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла {path.name}!')
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля!')
 
+        stats = dict.fromkeys(
+            ('rows', 'skipped', 'duplicates', 'new', 'updated'), 0
+        )
+        start = time.perf_counter()
         try:
-            with open(
-                f'{absolute_path}/{file_name}', 'r', encoding='utf-8'
-            ) as csvfile:
-                data = csv.DictReader(csvfile, ['name', 'measurement_unit'])
-                list_to_add_in_db = []
-                for row in data:
-                    list_to_add_in_db.append(Ingredient(
-                        name=row['name'],
-                        measurement_unit=row['measurement_unit'],
-                    ))
-                Ingredient.objects.bulk_create(list_to_add_in_db)
-            self.stdout.write('База данных добавлена!')
+            with open(path, encoding='utf-8', newline='') as file:
+                rows = self.read_rows(READERS[file_format](file), stats)
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    self.import_batch(batch, options['dry_run'], stats)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'Обработано строк: {stats["rows"]} '
+                        f'({stats["rows"] / elapsed:.0f} строк/с).'
+                    )
         except FileNotFoundError:
-            self.stdout.write(f'Файл {file_name} не найден!')
+            raise CommandError(f'Файл {path} не найден!')
+        except (ValueError, csv.Error) as error:
+            raise CommandError(
+                f'Ошибка в записи {stats["rows"] + 1}: {error}'
+            )
+
+        if (stats['new'] or stats['updated']) and not options['dry_run']:
+            ingredient_index.invalidate()
+            # Единицы измерения входят и в ответы с рецептами.
+            invalidate(INGREDIENTS)
+            invalidate(RECIPES)
+        elapsed = time.perf_counter() - start
+        existing = (
+            stats['rows'] - stats['skipped'] - stats['duplicates']
+            - stats['new'] - stats['updated']
+        )
+        if options['dry_run']:
+            action, update = 'Будет добавлено', 'будет изменено'
+        else:
+            action, update = 'Добавлено', 'изменено'
+        self.stdout.write(
+            f'{action} ингредиентов: {stats["new"]}, '
+            f'{update} единиц измерения: {stats["updated"]}, '
+            f'уже были в базе: {existing}, '
+            f'пропущено неверных строк: {stats["skipped"]}, '
+            f'повторов в файле: {stats["duplicates"]}. '
+            f'Время: {elapsed:.2f} с.'
+        )
@@ -0,0 +1,72 @@
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.images import image_storage
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Удаление файлов изображений, на которые не ссылается '
+            'ни один рецепт. С флагом --dry-run файлы не удаляются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько файлов будет удалено.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Не удалять файлы моложе указанного числа секунд: '
+                 'рецепт с ними может быть ещё не сохранён.',
+        )
+
+    def get_references(self):
+        """Число ссылок из рецептов на каждый файл."""
+        references = Counter()
+        recipes = Recipe.objects.values_list('image', 'image_variants')
+        for image, variants in recipes.iterator():
+            if image:
+                references[image] += 1
+            for formats in variants.get('files', {}).values():
+                for name in formats.values():
+                    references[name] += 1
+        return references
+
+    def walk(self, directory):
+        directories, files = image_storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name)
+        for name in directories:
+            yield from self.walk(posixpath.join(directory, name))
+
+    def handle(self, *args, **options):
+        references = self.get_references()
+        shared = sum(1 for count in references.values() if count > 1)
+        self.stdout.write(
+            f'Файлов, на которые ссылаются рецепты: {len(references)}, '
+            f'из них общих для нескольких рецептов: {shared}.'
+        )
+        root = Recipe._meta.get_field('image').upload_to.rstrip('/')
+        if not image_storage.exists(root):
+            return
+        threshold = timezone.now() - timedelta(seconds=options['min_age'])
+        removed = freed = 0
+        for name in self.walk(root):
+            if (
+                name in references
+                or image_storage.get_modified_time(name) > threshold
+            ):
+                continue
+            freed += image_storage.size(name)
+            removed += 1
+            if not options['dry_run']:
+                image_storage.delete(name)
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'{action} файлов: {removed} ({freed} байт).')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import needs_variants, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Построение уменьшенных копий изображений рецептов, '
+            'для которых они ещё не готовы. С флагом --all копии '
+            'перестраиваются у всех рецептов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перестроить копии у всех рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).only('image', 'image_variants').order_by('pk')
+        processed = 0
+        for recipe in recipes.iterator():
+            if options['all'] or needs_variants(recipe):
+                process_recipe_image(recipe.pk, force=options['all'])
+                processed += 1
+        self.stdout.write(f'Обработано изображений: {processed}.')
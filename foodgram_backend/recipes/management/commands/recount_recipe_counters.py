@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Q
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт счётчиков избранного и корзин у рецептов. '
+            'С флагом --check только сверяет данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, не изменяя их.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.with_actual_counters().filter(
+            ~Q(favorites_count=F('actual_favorites_count'))
+            | ~Q(in_carts_count=F('actual_in_carts_count'))
+        )
+        mismatches = recipes.count()
+        self.stdout.write(f'Рецептов с неверными счётчиками: {mismatches}.')
+        if options['check']:
+            if mismatches:
+                raise CommandError('Счётчики рецептов не совпадают!')
+            return
+        updated = recipes.values_list(
+            'pk', 'actual_favorites_count', 'actual_in_carts_count'
+        )
+        Recipe.objects.bulk_update(
+            [
+                Recipe(
+                    pk=pk,
+                    favorites_count=favorites_count,
+                    in_carts_count=in_carts_count,
+                )
+                for pk, favorites_count, in_carts_count in updated
+            ],
+            ('favorites_count', 'in_carts_count'),
+            batch_size=1000,
+        )
+        self.stdout.write('Счётчики рецептов пересчитаны!')
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Django 3.2 на PostgreSQL строит icontains и istartswith как
+# UPPER("name"::text) LIKE UPPER(%s), поэтому индекс нужен по тому же
+# выражению: индекс по самому name такие запросы не использует.
+CREATE_SQL = (
+    'DROP INDEX IF EXISTS recipes_ingredient_name_trgm',
+    'DROP INDEX IF EXISTS recipes_recipe_name_trgm',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_upper_trgm '
+    'ON recipes_ingredient USING gin ((UPPER(name::text)) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_name_upper_trgm '
+    'ON recipes_recipe USING gin ((UPPER(name::text)) gin_trgm_ops)',
+)
+
+DROP_SQL = (
+    'DROP INDEX IF EXISTS recipes_ingredient_name_upper_trgm',
+    'DROP INDEX IF EXISTS recipes_recipe_name_upper_trgm',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm '
+    'ON recipes_ingredient USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_name_trgm '
+    'ON recipes_recipe USING gin (name gin_trgm_ops)',
+)
+
+
+def run_on_postgres(statements):
+    """Выполняет SQL только на PostgreSQL, на других СУБД пропускает."""
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgres(CREATE_SQL),
+            run_on_postgres(DROP_SQL),
+        ),
+    ]
@@ -1,11 +1,15 @@
+from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce
 
 from recipes.constants import (COLOR_MAX_LENGTH, NAME_MAX_LENGTH,
                                SYMBOL_LIMIT, UNIT_MAX_LENGTH,
                                MIN_COOKING_TIME, MAX_COOKING_TIME,
                                MIN_AMOUNT, MAX_AMOUNT)
+from recipes.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -63,6 +67,79 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецептов."""
+
+    def with_user_flags(self, user):
+        """Аннотирует флаги избранного и корзины для пользователя."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favourite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                apps.get_model('cart', 'Cart').objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+        )
+
+    def with_actual_counters(self):
+        """Аннотирует фактическое число добавлений в избранное и корзины."""
+        def count(model):
+            return Coalesce(
+                models.Subquery(
+                    model.objects.filter(
+                        recipe=models.OuterRef('pk')
+                    ).order_by().values('recipe').annotate(
+                        total=models.Count('id')
+                    ).values('total')
+                ),
+                0
+            )
+        return self.annotate(
+            actual_favorites_count=count(Favourite),
+            actual_in_carts_count=count(apps.get_model('cart', 'Cart')),
+        )
+
+    def for_read(self, user):
+        """Подгружает все связанные данные для вывода рецептов.
+
+        Количество запросов не зависит от числа рецептов на странице.
+        """
+        authors = User.objects.all()
+        if user.is_authenticated:
+            authors = authors.annotate(
+                is_subscribed=models.Exists(
+                    apps.get_model('users', 'UserFollow').objects.filter(
+                        user_id=user,
+                        following_user_id=models.OuterRef('pk')
+                    )
+                )
+            )
+        return self.with_user_flags(user).prefetch_related(
+            models.Prefetch('author', queryset=authors),
+            'tags',
+            models.Prefetch(
+                'ingredient',
+                queryset=RecipeIngredientValue.objects.select_related(
+                    'ingredients'
+                ).order_by('ingredients__name'),
+                to_attr='ingredient_values',
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Моедь рецепта."""
 
@@ -78,6 +155,7 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/',
+        storage=ContentAddressedStorage(),
         null=True,
         default=None
     )
@@ -107,11 +185,43 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В корзинах',
+        default=0,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_feed_idx',
+            ),
+            models.Index(
+                fields=('-favorites_count', '-pub_date'),
+                name='recipe_popular_idx',
+            ),
+        )
 
     def __str__(self):
         return self.name[:SYMBOL_LIMIT]
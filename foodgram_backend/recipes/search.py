@@ -0,0 +1,147 @@
+from bisect import bisect_left
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+from recipes.constants import INGREDIENT_SEARCH_LIMIT, SEARCH_CONFIG
+from recipes.models import Ingredient, Recipe
+
+
+class IngredientIndex:
+    """Индекс для поиска ингредиентов по названию в памяти процесса.
+
+    Загружается при первом обращении и сбрасывается сигналами
+    при изменении ингредиентов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._keys = None
+        self._rows = None
+
+    def _load(self):
+        rows = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        keys = [row[0] for row in rows]
+        return keys, rows
+
+    def _get(self):
+        keys, rows = self._keys, self._rows
+        if keys is None:
+            with self._lock:
+                if self._keys is None:
+                    self._keys, self._rows = self._load()
+                keys, rows = self._keys, self._rows
+        return keys, rows
+
+    def invalidate(self):
+        """Сбросить индекс, он будет перестроен при следующем поиске."""
+        with self._lock:
+            self._keys = None
+            self._rows = None
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        """Возвращает ингредиенты, начинающиеся с query, затем содержащие."""
+        query = query.casefold()
+        keys, rows = self._get()
+        result = []
+        start = bisect_left(keys, query)
+        end = start
+        while (
+            end < len(keys)
+            and len(result) < limit
+            and keys[end].startswith(query)
+        ):
+            result.append(rows[end])
+            end += 1
+        if len(result) < limit:
+            for key, *row in rows:
+                if query in key and not key.startswith(query):
+                    result.append((key, *row))
+                    if len(result) >= limit:
+                        break
+        return [
+            Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+            for _, pk, name, measurement_unit in result
+        ]
+
+
+ingredient_index = IngredientIndex()
+
+
+class SimpleSearchBackend:
+    """Поиск без расширений СУБД.
+
+    Ингредиенты ищутся по индексу в памяти, рецепты - через icontains.
+    """
+
+    def search_ingredients(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        return ingredient_index.search(query, limit)
+
+    def search_recipes(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        )
+
+    def update_recipe(self, recipe):
+        """Обновить поисковые данные рецепта."""
+        self.update_recipes(Recipe.objects.filter(pk=recipe.pk))
+
+    def update_recipes(self, queryset):
+        """Обновить поисковые данные рецептов одним запросом."""
+
+
+class PostgresSearchBackend(SimpleSearchBackend):
+    """Поиск по индексам pg_trgm и полнотекстовому вектору рецепта.
+
+    На других СУБД работает как SimpleSearchBackend.
+    """
+
+    @staticmethod
+    def is_available():
+        return connection.vendor == 'postgresql'
+
+    def search_ingredients(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        if not self.is_available():
+            return super().search_ingredients(query, limit)
+        return list(
+            Ingredient.objects.filter(
+                name__icontains=query
+            ).annotate(
+                position=Case(
+                    When(name__istartswith=query, then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+            ).order_by('position', 'name')[:limit]
+        )
+
+    def search_recipes(self, queryset, query):
+        if not self.is_available():
+            return super().search_recipes(queryset, query)
+        return queryset.filter(
+            Q(name__icontains=query)
+            | Q(search_vector=SearchQuery(query, config=SEARCH_CONFIG))
+        )
+
+    def update_recipes(self, queryset):
+        if not self.is_available():
+            return
+        queryset.update(
+            search_vector=SearchVector('name', 'text', config=SEARCH_CONFIG)
+        )
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """Возвращает бэкенд поиска, указанный в настройке SEARCH_BACKEND."""
+    return import_string(settings.SEARCH_BACKEND)()
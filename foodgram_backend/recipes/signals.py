@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.images import needs_variants, schedule_image_processing
+from recipes.models import Favourite, Ingredient, Recipe
+from recipes.search import get_search_backend, ingredient_index
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    """Сбрасывает индекс поиска при изменении ингредиентов."""
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(sender, instance, update_fields, **kwargs):
+    """Обновляет поисковые данные рецепта после сохранения."""
+    if update_fields == frozenset(('image_variants',)):
+        return
+    get_search_backend().update_recipe(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_image(sender, instance, **kwargs):
+    """Ставит в очередь обработку нового изображения рецепта."""
+    if needs_variants(instance):
+        recipe_id = instance.pk
+        transaction.on_commit(
+            lambda: schedule_image_processing(recipe_id)
+        )
+
+
+@receiver(post_save, sender=Favourite)
+def increase_favorites_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик избранного у рецепта."""
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Favourite)
+def decrease_favorites_count(sender, instance, **kwargs):
+    """Уменьшает счётчик избранного у рецепта."""
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
@@ -104,11 +104,14 @@ class UserSubscriptionsSerializer(serializers.ModelSerializer):
         read_only_fields = '__all__',
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit')
-        recipes = obj.author_recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'recent_recipes'):
+            recipes = obj.recent_recipes
+        else:
+            request = self.context.get('request')
+            limit = request.query_params.get('recipes_limit')
+            recipes = obj.author_recipes.all()
+            if limit:
+                recipes = recipes[:int(limit)]
 
         return RecipeForUserSerializer(
             recipes,
@@ -116,6 +119,8 @@ class UserSubscriptionsSerializer(serializers.ModelSerializer):
         ).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.author_recipes.count()
 
     def get_is_subscribed(self, obj):
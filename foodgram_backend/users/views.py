@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
@@ -6,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework.validators import ValidationError
 
 from api.serializers import UserSerializer
+from api.utils import get_recent_recipes
 from users.models import UserFollow
 from users.serializers import (ChangePasswordSerializers, UserCreateSerializer,
                                UserSubscriptionsSerializer)
@@ -32,8 +34,18 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def subscriptions(self, request):
         """Возвращает подписки. В выдачу добавляются рецепты."""
-        users = User.objects.filter(followers__user_id=request.user)
+        users = User.objects.filter(
+            followers__user_id=request.user
+        ).annotate(
+            recipes_count=Count('author_recipes')
+        ).order_by('id')
         users = self.paginate_queryset(users)
+        limit = request.query_params.get('recipes_limit')
+        recipes = get_recent_recipes(
+            [user.id for user in users], int(limit) if limit else None
+        )
+        for user in users:
+            user.recent_recipes = recipes[user.id]
         serializer = UserSubscriptionsSerializer(
             users, many=True, context={'request': request}
         )
@@ -0,0 +1,119 @@
+import base64
+from io import BytesIO
+
+import pytest
+from django.core.cache import caches
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api import payloads
+from cart.models import Cart
+from recipes.models import (Favourite, Ingredient, Recipe,
+                            RecipeIngredientValue, Tag)
+from recipes.search import ingredient_index
+from users.models import User, UserFollow
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    caches['api'].clear()
+    payloads._payloads.clear()
+    ingredient_index.invalidate()
+    yield
+    caches['api'].clear()
+    payloads._payloads.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(
+        username='user', email='user@example.com', password='password'
+    )
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create_user(
+        username='author', email='author@example.com', password='password'
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number:02}', measurement_unit='г')
+        for number in range(60)
+    )
+    return list(Ingredient.objects.order_by('name'))
+
+
+@pytest.fixture
+def make_recipes(author, tags, ingredients):
+    """Создаёт рецепты автора с тегами и ингредиентами."""
+    def make(count, ingredients_count=3, **fields):
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                text='Описание', cooking_time=10, **fields,
+            )
+            recipe.tags.set(tags)
+            RecipeIngredientValue.objects.bulk_create(
+                RecipeIngredientValue(
+                    recipe=recipe, ingredients=ingredient, amount=10
+                )
+                for ingredient in ingredients[:ingredients_count]
+            )
+            recipes.append(recipe)
+        return recipes
+    return make
+
+
+@pytest.fixture
+def user_links(user, author):
+    """Подписывает пользователя на автора и добавляет рецепты автора
+    в избранное и корзину."""
+    def link(recipes):
+        UserFollow.objects.get_or_create(
+            user_id=user, following_user_id=author
+        )
+        for recipe in recipes:
+            Favourite.objects.get_or_create(user=user, recipe=recipe)
+            Cart.objects.get_or_create(user=user, recipe=recipe)
+    return link
+
+
+@pytest.fixture
+def png_data_url():
+    output = BytesIO()
+    Image.new('RGB', (10, 10), 'red').save(output, 'PNG')
+    encoded = base64.b64encode(output.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
@@ -0,0 +1,53 @@
+from django.core.management import call_command
+
+from api.cache import RECIPES, get_generation
+from recipes.models import Ingredient
+
+
+def import_rows(tmp_path, rows, **options):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text(
+        'name,measurement_unit\n' + ''.join(f'{row}\n' for row in rows),
+        encoding='utf-8',
+    )
+    call_command('add_data', path, **options)
+
+
+def get_units():
+    return set(Ingredient.objects.values_list('name', 'measurement_unit'))
+
+
+def test_import_skips_existing_and_duplicates(db, tmp_path, capsys):
+    import_rows(tmp_path, ['соль,г', 'соль,г', 'мука,г'])
+    import_rows(tmp_path, ['соль,г', 'сахар,г'], batch_size=1)
+
+    assert get_units() == {('соль', 'г'), ('мука', 'г'), ('сахар', 'г')}
+    assert 'повторов в файле: 1' in capsys.readouterr().out
+
+
+def test_import_updates_changed_unit(db, tmp_path):
+    import_rows(tmp_path, [
+        'соль,г', 'порошок,г', 'порошок,ч. л.', 'мука,г',
+    ])
+    generation = get_generation(RECIPES)
+
+    import_rows(tmp_path, ['соль,кг', 'порошок,шт.', 'мука,г'])
+
+    assert get_units() == {
+        ('соль', 'кг'), ('порошок', 'г'), ('порошок', 'ч. л.'),
+        ('порошок', 'шт.'), ('мука', 'г'),
+    }
+    assert get_generation(RECIPES) != generation
+
+
+def test_dry_run_lists_changes(db, tmp_path, capsys):
+    import_rows(tmp_path, ['соль,г'])
+    capsys.readouterr()
+
+    import_rows(tmp_path, ['соль,кг', 'мука,г'], dry_run=True)
+
+    output = capsys.readouterr().out
+    assert '+ мука, г' in output
+    assert '~ соль, г -> кг' in output
+    assert 'Будет добавлено ингредиентов: 1' in output
+    assert get_units() == {('соль', 'г')}
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+from django.core.management import call_command
+
+# Запас по времени ответа: CI медленнее машины, где записан бюджет.
+LATENCY_FACTOR = float(os.getenv('BENCHMARK_LATENCY_FACTOR', 10))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_fits_budget(ingredients, capsys):
+    """Число SQL-запросов основных эндпоинтов не больше бюджета
+    из api/benchmark_budget.json на тех же сгенерированных данных,
+    а p95 времени ответа не больше бюджета с запасом LATENCY_FACTOR.
+
+    Тест без общей транзакции, иначе точки сохранения добавляют
+    запросы, которых нет в работе сервиса."""
+    call_command('generate_data', users=50, recipes=300)
+    call_command('benchmark_api', repeat=3, latency_factor=LATENCY_FACTOR)
+
+    output = capsys.readouterr().out
+    assert 'нет бюджета' not in output
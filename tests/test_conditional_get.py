@@ -0,0 +1,63 @@
+import pytest
+from django.core.cache import caches
+
+from recipes.models import Favourite, Tag
+
+
+@pytest.fixture
+def recipe(make_recipes):
+    return make_recipes(1)[0]
+
+
+def get_etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response['ETag']
+
+
+@pytest.mark.parametrize('url', ('/api/tags/', '/api/ingredients/'))
+def test_etag_survives_cache_loss(url, anonymous_client, tags, ingredients):
+    """ETag не зависит от содержимого кэша: истечение записей или
+    другой процесс со своим кэшем дают тот же ETag."""
+    etag = get_etag(anonymous_client, url)
+    caches['api'].clear()
+
+    assert get_etag(anonymous_client, url) == etag
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_recipe_etag_is_stable_for_user(user_client, recipe):
+    url = f'/api/recipes/{recipe.id}/'
+    etag = get_etag(user_client, url)
+    caches['api'].clear()
+
+    assert get_etag(user_client, url) == etag
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_tag_change_changes_etag(anonymous_client, tags,
+                                 django_capture_on_commit_callbacks):
+    etag = get_etag(anonymous_client, '/api/tags/')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Ужин', color='#8775D2', slug='dinner')
+
+    response = anonymous_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert len(response.json()) == 3
+
+
+def test_favourite_changes_recipe_etag(user_client, user, recipe,
+                                       django_capture_on_commit_callbacks):
+    url = f'/api/recipes/{recipe.id}/'
+    etag = get_etag(user_client, url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Favourite.objects.create(user=user, recipe=recipe)
+
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['is_favorited'] is True
@@ -0,0 +1,74 @@
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.utils import decode_base64_image
+
+Image.init()
+
+
+def to_data_url(content_type, image_format, **params):
+    output = BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(output, image_format, **params)
+    encoded = base64.b64encode(output.getvalue()).decode()
+    return f'data:{content_type};base64,{encoded}'
+
+
+@pytest.mark.parametrize('content_type, image_format', [
+    ('image/jpeg', 'JPEG'),
+    ('image/png', 'PNG'),
+    ('image/webp', 'WEBP'),
+    ('image/gif', 'GIF'),
+])
+def test_decode_image(content_type, image_format):
+    image_file = decode_base64_image(to_data_url(content_type, image_format))
+
+    assert image_file.content_type == content_type
+    assert Image.open(image_file).size == (40, 30)
+
+
+@pytest.mark.skipif('MPO' not in Image.SAVE, reason='Pillow без записи MPO.')
+def test_decode_mpo_as_jpeg():
+    """Снимки телефонов в формате MPO принимаются как image/jpeg."""
+    data = to_data_url(
+        'image/jpeg', 'MPO', save_all=True,
+        append_images=[Image.new('RGB', (40, 30), 'blue')],
+    )
+
+    image_file = decode_base64_image(data)
+
+    assert image_file.content_type == 'image/jpeg'
+    assert image_file.name == 'image.jpeg'
+    assert Image.open(image_file).format == 'MPO'
+
+
+def test_decode_rejects_mismatched_type():
+    with pytest.raises(ValidationError):
+        decode_base64_image(to_data_url('image/png', 'JPEG'))
+
+
+@pytest.mark.parametrize('content_type, image_format', [
+    ('image/jpeg', 'JPEG'),
+    ('image/png', 'PNG'),
+    ('image/webp', 'WEBP'),
+])
+def test_decode_removes_exif(content_type, image_format):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Поворот на 90°.
+    exif.get_ifd(0x8825)[2] = (55.0, 45.0, 0.0)  # Широта съёмки.
+    data = to_data_url(
+        content_type, image_format, exif=exif.tobytes(), xmp=b'<x:xmpmeta/>'
+    )
+
+    image_file = decode_base64_image(data)
+
+    image = Image.open(image_file)
+    assert image.format == image_format
+    assert image.size == (30, 40)
+    assert not set(image.info) & {'exif', 'xmp'}
+    assert not image.getexif()
+    image_file.seek(0)
+    assert image_file.size == len(image_file.read())
@@ -0,0 +1,46 @@
+import pytest
+from django.test import RequestFactory
+
+from api.metrics import FileStore, clear_directory
+from api.views import metrics
+
+
+@pytest.fixture
+def metrics_settings(settings):
+    settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+    settings.METRICS_TOKEN = 'secret'
+    return settings
+
+
+@pytest.mark.parametrize('address, authorization, status', (
+    ('127.0.0.1', '', 200),
+    ('10.0.0.5', 'Bearer secret', 200),
+    ('10.0.0.5', '', 403),
+    ('10.0.0.5', 'Bearer wrong', 403),
+    ('10.0.0.5', 'Basic secret', 403),
+))
+def test_metrics_access(metrics_settings, address, authorization, status):
+    request = RequestFactory().get(
+        '/metrics', REMOTE_ADDR=address, HTTP_AUTHORIZATION=authorization
+    )
+
+    assert metrics(request).status_code == status
+
+
+def test_metrics_without_token_are_closed(metrics_settings):
+    metrics_settings.METRICS_TOKEN = ''
+    request = RequestFactory().get(
+        '/metrics', REMOTE_ADDR='10.0.0.5', HTTP_AUTHORIZATION='Bearer '
+    )
+
+    assert metrics(request).status_code == 403
+
+
+def test_clear_directory_drops_previous_run(tmp_path):
+    FileStore(tmp_path).add('requests', 5)
+    (tmp_path / 'other.txt').write_text('не метрики')
+
+    clear_directory(tmp_path)
+
+    assert FileStore(tmp_path).collect() == {}
+    assert (tmp_path / 'other.txt').exists()
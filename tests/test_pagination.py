@@ -0,0 +1,71 @@
+import base64
+
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+
+def get_names(response):
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+def test_cursor_pagination(user_client, make_recipes):
+    make_recipes(5)
+
+    response = user_client.get('/api/recipes/?pagination=cursor&limit=2')
+
+    assert response.status_code == 200
+    data = response.json()
+    assert 'count' not in data
+    assert get_names(response) == ['Рецепт 4', 'Рецепт 3']
+    assert get_names(user_client.get(data['next'])) == [
+        'Рецепт 2', 'Рецепт 1'
+    ]
+
+
+def test_cursor_pagination_with_equal_dates(user_client, make_recipes):
+    make_recipes(5)
+    Recipe.objects.update(pub_date=timezone.now())
+
+    first = user_client.get('/api/recipes/?pagination=cursor&limit=2')
+    second = user_client.get(first.json()['next'])
+    third = user_client.get(second.json()['next'])
+
+    assert get_names(first) == ['Рецепт 4', 'Рецепт 3']
+    assert get_names(second) == ['Рецепт 2', 'Рецепт 1']
+    assert get_names(third) == ['Рецепт 0']
+    assert third.json()['next'] is None
+    previous = user_client.get(third.json()['previous'])
+    assert get_names(previous) == ['Рецепт 2', 'Рецепт 1']
+    assert get_names(user_client.get(previous.json()['previous'])) == [
+        'Рецепт 4', 'Рецепт 3'
+    ]
+
+
+def test_cursor_pagination_rejects_invalid_cursor(user_client):
+    cursor = base64.b64encode(b'p=2024-01-01').decode()
+
+    response = user_client.get(f'/api/recipes/?cursor={cursor}')
+
+    assert response.status_code == 404
+
+
+def test_cursor_pagination_rejects_popular_ordering(user_client,
+                                                    make_recipes):
+    make_recipes(2)
+
+    response = user_client.get(
+        '/api/recipes/?pagination=cursor&ordering=popular'
+    )
+
+    assert response.status_code == 400
+    assert 'popular' in str(response.json())
+
+
+def test_popular_ordering_with_page_pagination(user_client, make_recipes):
+    make_recipes(2)
+
+    response = user_client.get('/api/recipes/?ordering=popular&limit=1')
+
+    assert response.status_code == 200
+    assert response.json()['count'] == 2
@@ -0,0 +1,75 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+
+from api import payloads
+from recipes.models import Tag
+
+
+def get_slugs(response):
+    content = response.content
+    if response.get('Content-Encoding') == 'gzip':
+        content = gzip.decompress(content)
+    return [tag['slug'] for tag in json.loads(content)]
+
+
+def test_built_payload_is_shared_between_processes(
+    anonymous_client, tags, django_assert_num_queries
+):
+    call_command('build_payloads')
+    # Другой процесс: в его памяти готовых списков нет.
+    payloads._payloads.clear()
+
+    # Поколение и готовый список, без запроса тегов.
+    with django_assert_num_queries(2):
+        response = anonymous_client.get(
+            '/api/tags/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+    assert response['Content-Encoding'] == 'gzip'
+    assert get_slugs(response) == ['breakfast', 'lunch']
+
+
+def test_payload_is_rebuilt_after_change(
+    anonymous_client, tags, django_capture_on_commit_callbacks
+):
+    call_command('build_payloads')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Ужин', color='#8775D2', slug='dinner')
+    payloads._payloads.clear()
+
+    response = anonymous_client.get('/api/tags/')
+    assert get_slugs(response) == ['breakfast', 'lunch', 'dinner']
+
+
+def test_change_rebuilds_payload_on_commit(
+    anonymous_client, tags, django_capture_on_commit_callbacks,
+    django_assert_num_queries
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Ужин', color='#8775D2', slug='dinner')
+        Tag.objects.filter(slug='lunch').delete()
+    payloads._payloads.clear()
+
+    # Список уже собран после фиксации: только поколение и список.
+    with django_assert_num_queries(2):
+        response = anonymous_client.get('/api/tags/')
+
+    assert get_slugs(response) == ['breakfast', 'dinner']
+
+
+@pytest.mark.parametrize('accept_encoding, expected', (
+    ('gzip', True),
+    ('deflate, gzip;q=0.5', True),
+    ('*', True),
+    ('', False),
+    ('gzip;q=0', False),
+    ('gzip; q=0.0, br', False),
+    ('*;q=1, gzip;q=0', False),
+    ('identity', False),
+))
+def test_accepts_gzip(accept_encoding, expected):
+    assert payloads.accepts_gzip(accept_encoding) is expected
@@ -0,0 +1,93 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Число рецептов, рецепты с флагами, авторы, теги, ингредиенты.
+LIST_QUERIES = 5
+# Счётчики и поколения для ETag, рецепт с флагами, автор, теги,
+# ингредиенты.
+DETAIL_QUERIES = 6
+
+
+@pytest.mark.parametrize('limit', (2, 10))
+def test_recipe_list_queries_do_not_depend_on_page_size(
+    limit, user_client, make_recipes, user_links,
+    django_assert_num_queries
+):
+    recipes = make_recipes(10)
+    user_links(recipes)
+
+    with django_assert_num_queries(LIST_QUERIES):
+        response = user_client.get(f'/api/recipes/?limit={limit}')
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == limit
+    assert all(recipe['is_favorited'] for recipe in results)
+    assert all(recipe['author']['is_subscribed'] for recipe in results)
+    assert all(len(recipe['ingredients']) == 3 for recipe in results)
+
+
+@pytest.mark.parametrize('ingredients_count', (1, 20))
+def test_recipe_detail_queries_do_not_depend_on_ingredients(
+    ingredients_count, user_client, make_recipes, user_links,
+    django_assert_num_queries
+):
+    recipe, = make_recipes(1, ingredients_count)
+    user_links([recipe])
+
+    with django_assert_num_queries(DETAIL_QUERIES):
+        response = user_client.get(f'/api/recipes/{recipe.id}/')
+
+    assert response.status_code == 200
+    assert len(response.json()['ingredients']) == ingredients_count
+
+
+def create_recipe(client, name, tags, ingredients, image):
+    """Создаёт рецепт и возвращает ответ и число запросов."""
+    data = {
+        'name': name,
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': image,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10} for ingredient in ingredients
+        ],
+    }
+    with CaptureQueriesContext(connection) as context:
+        response = client.post('/api/recipes/', data, format='json')
+    assert response.status_code == 201, response.json()
+    return response, len(context)
+
+
+def test_recipe_create_queries_do_not_depend_on_size(
+    user_client, tags, ingredients, png_data_url
+):
+    # Сравниваются два рецепта, а не число запросов: оно зависит
+    # от СУБД и точек сохранения.
+    _, small = create_recipe(
+        user_client, 'Маленький', tags[:1], ingredients[:5], png_data_url
+    )
+    response, large = create_recipe(
+        user_client, 'Большой', tags, ingredients[:50], png_data_url
+    )
+
+    assert large == small
+    assert len(response.json()['tags']) == len(tags)
+    assert len(response.json()['ingredients']) == 50
+
+
+def test_recipe_create_rejects_unknown_tag(user_client, tags, ingredients,
+                                           png_data_url):
+    response = user_client.post('/api/recipes/', {
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': png_data_url,
+        'tags': [tags[0].id, 999],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+    }, format='json')
+
+    assert response.status_code == 400
+    assert '999' in response.json()['tags'][0]
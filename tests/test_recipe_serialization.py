@@ -0,0 +1,71 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from recipes.images import get_ready_variants
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def recipes(user, author, user_client, tags, ingredients, png_data_url,
+            make_recipes, user_links, settings,
+            django_capture_on_commit_callbacks):
+    """Рецепты с изображениями и без, свои и чужие, в избранном
+    и корзине пользователя, подписанного на автора."""
+    settings.IMAGE_PROCESSING_WORKERS = 0
+    author_client = APIClient()
+    author_client.force_authenticate(author)
+    data = {
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': png_data_url,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10}
+            for ingredient in ingredients[:3]
+        ],
+    }
+    plain = make_recipes(2)
+    with django_capture_on_commit_callbacks(execute=True):
+        for client, name in ((author_client, 'С фото'),
+                             (user_client, 'Свой')):
+            response = client.post(
+                '/api/recipes/', {**data, 'name': name}, format='json'
+            )
+            assert response.status_code == 201
+    user_links([plain[0], Recipe.objects.get(name='С фото')])
+    recipes = list(Recipe.objects.all())
+    assert sum(map(bool, map(get_ready_variants, recipes))) == 2
+    return recipes
+
+
+def render(client, url, settings, fast):
+    settings.RECIPE_FAST_SERIALIZATION = fast
+    caches['api'].clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_fast_serialization_matches_serializer(authenticated, recipes,
+                                                user_client,
+                                                anonymous_client, settings):
+    client = user_client if authenticated else anonymous_client
+    for url in ['/api/recipes/?limit=10'] + [
+        f'/api/recipes/{recipe.id}/' for recipe in recipes
+    ]:
+        fast = render(client, url, settings, True)
+        assert fast == render(client, url, settings, False)
+
+    results = render(
+        client, '/api/recipes/?limit=10', settings, True
+    )['results']
+    assert len(results) == 4
+    assert any(recipe['image_variants'] for recipe in results)
+    if authenticated:
+        assert {
+            recipe['name'] for recipe in results
+            if recipe['author']['is_subscribed']
+        } == {'С фото', 'Рецепт 0', 'Рецепт 1'}
+        assert sum(recipe['is_favorited'] for recipe in results) == 2
@@ -0,0 +1,111 @@
+import pytest
+from django.contrib.auth.hashers import make_password
+from rest_framework.test import APIClient
+
+from api.cache import RECIPES, get_generation, invalidate
+from recipes.models import Favourite
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Кэш api, общий для процессов: файловый."""
+    settings.CACHES = {
+        **settings.CACHES,
+        'api': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path / 'cache'),
+            'TIMEOUT': 60,
+        },
+    }
+
+
+@pytest.fixture
+def on_commit(django_capture_on_commit_callbacks):
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+def test_cache_hit_does_not_query_database(
+    shared_cache, anonymous_client, make_recipes, django_assert_num_queries
+):
+    make_recipes(3)
+    assert anonymous_client.get('/api/recipes/')['X-Cache'] == 'MISS'
+
+    with django_assert_num_queries(0):
+        response = anonymous_client.get('/api/recipes/')
+
+    assert response['X-Cache'] == 'HIT'
+    assert len(response.json()['results']) == 3
+
+
+def test_generation_survives_in_shared_cache(shared_cache, db, on_commit):
+    generation = get_generation(RECIPES)
+    assert get_generation(RECIPES) == generation
+
+    with on_commit():
+        invalidate(RECIPES)
+
+    assert get_generation(RECIPES) != generation
+
+
+def test_favourite_updates_cached_counters(
+    shared_cache, anonymous_client, user, make_recipes, on_commit
+):
+    recipe, = make_recipes(1)
+    url = f'/api/recipes/{recipe.id}/'
+    assert anonymous_client.get(url).json()['favorites_count'] == 0
+
+    with on_commit():
+        Favourite.objects.create(user=user, recipe=recipe)
+
+    response = anonymous_client.get(url)
+    assert response['X-Cache'] == 'MISS'
+    assert response.json()['favorites_count'] == 1
+
+
+def test_unrelated_user_changes_keep_cache(shared_cache, author,
+                                           make_recipes, on_commit):
+    make_recipes(1)
+    generation = get_generation(RECIPES)
+
+    with on_commit():
+        author.password = make_password('new password')
+        author.save()
+        author.save(update_fields=['last_login'])
+
+    assert get_generation(RECIPES) == generation
+
+
+def test_author_name_change_clears_cache(shared_cache, author,
+                                         make_recipes, on_commit):
+    make_recipes(1)
+    generation = get_generation(RECIPES)
+
+    with on_commit():
+        author.first_name = 'Новое имя'
+        author.save()
+
+    assert get_generation(RECIPES) != generation
+
+
+def test_ingredient_amount_change_clears_cache(author, make_recipes,
+                                               png_data_url, on_commit):
+    recipe, = make_recipes(1, ingredients_count=2)
+    generation = get_generation(RECIPES)
+    client = APIClient()
+    client.force_authenticate(author)
+
+    with on_commit():
+        response = client.patch(f'/api/recipes/{recipe.id}/', {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'image': png_data_url,
+            'tags': [tag.id for tag in recipe.tags.all()],
+            'ingredients': [
+                {'id': value.ingredients_id, 'amount': value.amount + 1}
+                for value in recipe.ingredient.all()
+            ],
+        }, format='json')
+
+    assert response.status_code == 200
+    assert get_generation(RECIPES) != generation
@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Ingredient, Recipe
+from recipes.search import PostgresSearchBackend
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql', reason='Нужен PostgreSQL.'
+)
+
+
+@pytest.fixture
+def without_seqscan(db):
+    """Запрещает полный просмотр таблиц и индексов, чтобы проверить
+    индексы на маленьких тестовых таблицах."""
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+        cursor.execute('SET enable_indexscan = off')
+    yield
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = on')
+        cursor.execute('SET enable_indexscan = on')
+
+
+def analyze(model):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def test_ingredient_search_uses_trigram_index(without_seqscan):
+    Ingredient.objects.bulk_create((
+        Ingredient(name='Flour', measurement_unit='g'),
+        Ingredient(name='Sugar', measurement_unit='g'),
+    ))
+    analyze(Ingredient)
+
+    found = PostgresSearchBackend().search_ingredients('LOU')
+    plan = Ingredient.objects.filter(name__icontains='lou').explain()
+
+    assert [ingredient.name for ingredient in found] == ['Flour']
+    assert 'recipes_ingredient_name_upper_trgm' in plan
+
+
+def test_recipe_search_uses_trigram_index(without_seqscan, make_recipes):
+    make_recipes(2)
+    Recipe.objects.filter(name='Рецепт 1').update(name='Pancakes')
+    analyze(Recipe)
+
+    queryset = PostgresSearchBackend().search_recipes(
+        Recipe.objects.all(), 'cake'
+    )
+
+    assert [recipe.name for recipe in queryset] == ['Pancakes']
+    assert 'recipes_recipe_name_upper_trgm' in queryset.explain()
@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+from django.db import connection, transaction
+
+from cart.models import Cart, ShoppingListItem
+from cart.utils import calculate_shopping_lists, update_shopping_lists
+
+
+def get_list(user):
+    return dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient_id', 'total_amount'
+        )
+    )
+
+
+def test_cart_changes_update_shopping_list(user, make_recipes):
+    first, second = make_recipes(2, ingredients_count=3)
+
+    Cart.objects.create(user=user, recipe=first)
+    Cart.objects.create(user=user, recipe=second)
+    assert get_list(user) == {
+        ingredient_id: total
+        for (_, ingredient_id), total in calculate_shopping_lists(
+            [user.id]
+        ).items()
+    }
+    assert set(get_list(user).values()) == {20}
+
+    Cart.objects.filter(user=user, recipe=first).delete()
+    assert set(get_list(user).values()) == {10}
+
+    Cart.objects.filter(user=user, recipe=second).delete()
+    assert get_list(user) == {}
+
+
+def test_update_skips_empty_changes(user, ingredients,
+                                    django_assert_num_queries):
+    with django_assert_num_queries(0):
+        update_shopping_lists([user.id], {ingredients[0].id: 0})
+        update_shopping_lists([], {ingredients[0].id: 10})
+
+
+def test_update_queries_do_not_depend_on_amounts(
+    user, ingredients, django_assert_num_queries
+):
+    deltas = {
+        ingredient.id: number for number, ingredient in enumerate(
+            ingredients[:10], start=1
+        )
+    }
+
+    # Точка сохранения, вставка, изменение сумм, освобождение.
+    with django_assert_num_queries(4):
+        update_shopping_lists([user.id], deltas)
+    # Точка сохранения, изменение сумм, удаление, освобождение.
+    with django_assert_num_queries(4):
+        update_shopping_lists(
+            [user.id], {ingredient_id: -5 for ingredient_id in deltas}
+        )
+
+    assert get_list(user) == {
+        ingredient_id: delta - 5
+        for ingredient_id, delta in deltas.items() if delta > 5
+    }
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql', reason='Нужен PostgreSQL.'
+)
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_additions_of_new_ingredient(user, ingredients):
+    """Второй запрос добавляет тот же новый ингредиент, пока первый
+    ещё не завершил транзакцию."""
+    ingredient_id = ingredients[0].id
+    first_updated = threading.Event()
+    errors = []
+
+    def first():
+        try:
+            with transaction.atomic():
+                update_shopping_lists([user.id], {ingredient_id: 10})
+                first_updated.set()
+                # Второй запрос ждёт строку, вставленную этой транзакцией.
+                threading.Event().wait(0.3)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            first_updated.set()
+            connection.close()
+
+    def second():
+        try:
+            first_updated.wait(5)
+            update_shopping_lists([user.id], {ingredient_id: 5})
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert errors == []
+    assert get_list(user) == {ingredient_id: 15}
@@ -0,0 +1,173 @@
+import re
+import string
+import zlib
+from io import BytesIO
+
+import pytest
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont
+
+from api.pdf import (FIRST_PAGE_OBJECT, FONT_FILE, LINE_WIDTH, LINES_PER_PAGE,
+                     generate_pdf, load_font, wrap_line)
+from cart.models import ShoppingListItem
+from recipes.models import Ingredient
+
+CYRILLIC = ''.join(map(chr, range(ord('А'), ord('я') + 1))) + 'Ёё'
+FONT_CHARS = string.printable.strip() + ' ' + CYRILLIC + '№'
+
+
+def build_font(path, chars):
+    """TrueType-шрифт с прямоугольным глифом для каждого символа."""
+    names = ['.notdef'] + [f'uni{ord(char):04X}' for char in chars]
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(names)
+    builder.setupCharacterMap(
+        {ord(char): f'uni{ord(char):04X}' for char in chars}
+    )
+    glyphs = {}
+    for name in names:
+        pen = TTGlyphPen(None)
+        pen.moveTo((50, 0))
+        pen.lineTo((50, 700))
+        pen.lineTo((450, 700))
+        pen.lineTo((450, 0))
+        pen.closePath()
+        glyphs[name] = pen.glyph()
+    builder.setupGlyf(glyphs)
+    builder.setupHorizontalMetrics({name: (500, 50) for name in names})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({'familyName': 'Test', 'styleName': 'Regular'})
+    builder.setupOS2()
+    builder.setupPost()
+    builder.save(str(path))
+
+
+@pytest.fixture
+def pdf_font(tmp_path, settings):
+    path = tmp_path / 'font.ttf'
+    build_font(path, FONT_CHARS)
+    settings.SHOPPING_LIST_PDF_FONT = str(path)
+    return path
+
+
+@pytest.fixture
+def shopping_list(user):
+    """Список покупок на три страницы PDF."""
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Продукт {number:03}', measurement_unit='г')
+        for number in range(LINES_PER_PAGE * 2 + 10)
+    )
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(user=user, ingredient=ingredient, total_amount=100)
+        for ingredient in Ingredient.objects.all()
+    )
+
+
+def get_object(content, number):
+    match = re.search(
+        rb'(?s)\n%d 0 obj\n(.*?)\nendobj\n' % number, content
+    )
+    assert match, f'Нет объекта {number}'
+    return match.group(1)
+
+
+def get_stream(content, number):
+    body = get_object(content, number)
+    return zlib.decompress(body.split(b'stream\n', 1)[1].rsplit(
+        b'\nendstream', 1
+    )[0])
+
+
+def download(client):
+    response = client.get('/api/recipes/download_shopping_cart/?format=pdf')
+    return response, b''.join(response.streaming_content)
+
+
+def test_pdf_is_valid_and_paginated(user_client, pdf_font, shopping_list):
+    response, content = download(user_client)
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/pdf'
+    assert content.startswith(b'%PDF-1.4\n')
+    assert content.endswith(b'%%EOF\n')
+    assert b'/Count 3' in content
+    startxref = int(re.search(rb'startxref\n(\d+)\n', content).group(1))
+    assert content[startxref:].startswith(b'xref\n')
+    offsets = re.findall(rb'(\d{10}) 00000 n ', content[startxref:])
+    for number, offset in enumerate(offsets, start=1):
+        assert content[int(offset):].startswith(b'%d 0 obj\n' % number)
+
+
+def test_pdf_embeds_only_used_glyphs(user_client, pdf_font, shopping_list):
+    _, content = download(user_client)
+
+    font = TTFont(BytesIO(get_stream(content, FONT_FILE)))
+    glyf = font['glyf']
+    drawn = {
+        glyph for glyph, name in enumerate(font.getGlyphOrder())
+        if glyf[name].numberOfContours
+    }
+    original = TTFont(str(pdf_font))
+    cmap = original.getBestCmap()
+    text = 'Foodgram Список покупок пользователя Продукт 0123456789 - г'
+    # Номера глифов не меняются, поэтому /CIDToGIDMap /Identity верен.
+    assert drawn == {0} | {
+        original.getGlyphID(cmap[ord(char)]) for char in text
+    }
+    assert len(font.getGlyphOrder()) <= len(original.getGlyphOrder())
+    assert len(content) < pdf_font.stat().st_size + 20000
+
+
+def test_pdf_without_font_returns_clear_error(user_client, settings,
+                                              tmp_path, shopping_list):
+    settings.SHOPPING_LIST_PDF_FONT = str(tmp_path / 'missing.ttf')
+
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/?format=pdf'
+    )
+
+    assert response.status_code == 503
+    assert response['Content-Type'].startswith('application/json')
+    assert 'шрифт' in response.json()['detail']
+
+
+def test_text_shopping_list_still_works_without_font(
+    user_client, settings, tmp_path, shopping_list
+):
+    settings.SHOPPING_LIST_PDF_FONT = str(tmp_path / 'missing.ttf')
+
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/?format=txt'
+    )
+
+    assert response.status_code == 200
+    assert 'Продукт 000 - 100 г' in b''.join(
+        response.streaming_content
+    ).decode()
+
+
+def test_long_lines_are_wrapped_by_glyph_width(pdf_font):
+    font = load_font(str(pdf_font))
+    # Все глифы шириной 500, в строку помещается столько символов.
+    per_line = LINE_WIDTH // 500
+    line = ' '.join(['слово'] * 40) + ' ' + 'ж' * (per_line + 5)
+
+    parts = wrap_line(line, font)
+
+    assert all(len(part) <= per_line for part in parts)
+    assert all(not part.startswith(' ') for part in parts)
+    assert ' '.join(parts[:-2]).split() == ['слово'] * 40
+    assert parts[-2:] == ['ж' * per_line, 'ж' * 5]
+    assert wrap_line('Короткая строка', font) == ['Короткая строка']
+
+
+def test_wrapped_lines_fill_pages(pdf_font):
+    font = load_font(str(pdf_font))
+    long_line = 'продукт ' * (LINE_WIDTH // 500 // 4)
+
+    content = b''.join(generate_pdf([long_line] * LINES_PER_PAGE, font))
+
+    assert b'/Count 2' in content
+    page = get_stream(content, FIRST_PAGE_OBJECT)
+    assert page.count(b' Tj T*') == LINES_PER_PAGE